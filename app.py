@@ -1,20 +1,55 @@
 import os
+import threading
 import time
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import altair as alt
+import numpy as np
 import pandas as pd
 import pydeck as pdk
 import requests
 import streamlit as st
-
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import http_client
+from availability import availability_stats
+from coverage import (
+    CoverageArchive,
+    CoverageCache,
+    PayloadFetcher,
+    Polygon,
+    coverage_trend,
+    load_coverage,
+    range_days_params,
+)
+from disk_cache import bust_time, default_cache, disk_cached
+from geometry import bounds, centroid, empty_polygon, encode_polygon, fit_zoom, simplify_cached, zoom_tolerance
+from metrics import METRICS_BUFFER_SIZE, METRICS_PORT, RequestSample, counted, registry, serve
+from msg_rates import MSG_RATE_RETENTION_HOURS, MsgRateCache, downsample_msg_rates, parse_msg_rates
+from prefetch import PREFETCH_ENABLED, Prefetcher, Snapshot
+from rate_limiter import BACKFILL, BULK, RateLimited, RequestScheduler, current_priority, request_priority
 from sensor_metadata import build_sensor_mappings, fetch_sensor_details, normalize_serial
-
-AUTH_URL = "https://auth.opensky-network.org/auth/realms/opensky-network/protocol/openid-connect/token"
-BASE_API_URL = "https://opensky-network.org/api"
-POCKETHOST_BASE = "https://opdi.pockethost.io"
-POCKETHOST_COLLECTION = "opensky_sensor_status"
+from status_history import max_record_gap, rebuild_timeline, records_to_frame, status_segments
+from singleflight import SingleFlight, request_key
+from status_store import StatusStore
+from token_manager import TokenManager, get_manager
+
+BASE_API_URL = os.getenv("OPENSKY_API_URL", "https://opensky-network.org/api")
+COVERAGE_MAX_WORKERS = int(os.getenv("COVERAGE_MAX_WORKERS", "8"))
+COVERAGE_STREAM_INTERVAL = 1.0  # seconds between progressive map redraws
+CHART_WIDTH_PX = int(os.getenv("CHART_WIDTH_PX", "1400"))
+MSG_DOWNSAMPLE_METHOD = os.getenv("MSG_DOWNSAMPLE_METHOD", "lttb")  # "lttb" or "minmax"
+MAP_HEIGHT_PX = 500  # st.pydeck_chart default height
+HISTORY_MAX_MONTHS = 12
+# Background refresh intervals (seconds) for the prefetched views; see prefetch.py.
+PREFETCH_FLEET_INTERVAL = int(os.getenv("PREFETCH_FLEET_INTERVAL", "300"))
+PREFETCH_MSG_RATE_INTERVAL = int(os.getenv("PREFETCH_MSG_RATE_INTERVAL", "60"))
+PREFETCH_COVERAGE_INTERVAL = int(os.getenv("PREFETCH_COVERAGE_INTERVAL", "600"))
+PREFETCH_HISTORY_INTERVAL = int(os.getenv("PREFETCH_HISTORY_INTERVAL", "300"))
+VIEWS = ["Site view", "All sensors", "Status history", "Coverage history", "Operations"]
+# Seconds between automatic refreshes of the fleet tiles at the top of the page (0 turns it off).
+HEADER_REFRESH_SECONDS = int(os.getenv("HEADER_REFRESH_SECONDS", "60"))
 
 ALL_SERIALS: List[int] = []
 SERIAL_TO_SITE: Dict[int, Dict] = {}
@@ -66,11 +101,17 @@ def _get_pockethost_token() -> str:
     return os.getenv("POCKETHOST_ADMIN_TOKEN") or _load_secrets("pockethost_admin_token", "")
 
 
-@st.cache_data(show_spinner=False, ttl=600)
-def load_sensor_metadata(
-    ph_token: str, cache_bust: str
-) -> Tuple[pd.DataFrame, List[int], Dict[int, Dict[str, object]], Dict[str, Dict[str, object]]]:
+SensorMetadata = Tuple[pd.DataFrame, List[int], Dict[int, Dict[str, object]], Dict[str, Dict[str, object]]]
+
+
+@counted(st.cache_data(show_spinner=False, ttl=600))
+def load_sensor_metadata(ph_token: str, cache_bust: str) -> SensorMetadata:
     """Load sensor/site metadata from PocketBase."""
+    return _load_sensor_metadata(ph_token, cache_bust)
+
+
+@disk_cached("sensor_metadata", ttl=600)
+def _load_sensor_metadata(ph_token: str, cache_bust: str) -> SensorMetadata:
     if not ph_token:
         return pd.DataFrame(), [], {}, {}
     try:
@@ -85,30 +126,51 @@ def load_sensor_metadata(
     return df, all_serials, serial_to_site, monitor_sites
 
 
-@st.cache_data(ttl=1500, show_spinner=False)
-def fetch_token(client_id: str, client_secret: str, cache_bust: str) -> str:
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": client_id,
-        "client_secret": client_secret,
-    }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(AUTH_URL, data=data, headers=headers, timeout=20)
-    if not response.ok:
-        raise RuntimeError(f"Token request failed ({response.status_code}): {response.text}")
-    token = response.json().get("access_token")
-    if not token:
-        raise RuntimeError("Token response did not include access_token")
-    return token
+def _token_manager() -> Optional[TokenManager]:
+    """The process-wide OpenSky token manager for the configured credentials (None if unset)."""
+    client_id, client_secret = _get_credentials()
+    if not client_id or not client_secret:
+        return None
+    return get_manager(client_id, client_secret)
+
+
+@st.cache_resource(show_spinner=False)
+def _single_flight() -> SingleFlight:
+    return SingleFlight()
+
+
+@st.cache_resource(show_spinner=False)
+def _scheduler() -> RequestScheduler:
+    """Per-endpoint rate limits for OpenSky, shared by every session and the prefetcher."""
+    return RequestScheduler()
 
 
 def _api_get(path: str, token: str, params: Optional[Dict] = None) -> Dict:
     url = f"{BASE_API_URL}{path}"
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    resp = requests.get(url, headers=headers, params=params or {}, timeout=30)
-    if st.session_state.get("log_api", True):
-        log_entry = {"url": url, "params": params or {}, "status": resp.status_code}
-        st.session_state.setdefault("api_logs", []).append(log_entry)
+    manager = _token_manager()
+    priority = current_priority()
+
+    def _get() -> requests.Response:
+        started = time.perf_counter()
+        try:
+            # 429s go back through the scheduler rather than being retried on the spot.
+            if manager is not None:
+                # Retries a 401 once with a refreshed token.
+                resp = manager.request("GET", url, token=token or None, params=params or {}, retry_429=False)
+            else:
+                headers = {"Authorization": f"Bearer {token}"} if token else {}
+                resp = http_client.get(url, headers=headers, params=params or {}, retry_429=False)
+        except Exception:
+            registry.record_request(path, 0, time.perf_counter() - started)
+            raise
+        registry.record_request(path, resp.status_code, time.perf_counter() - started, len(resp.content))
+        return resp
+
+    def _send() -> requests.Response:
+        return _scheduler().send(path, _get, priority)
+
+    # Identical requests from concurrent sessions share one upstream call; each parses its own copy.
+    resp = _single_flight().do(request_key(path, params), _send)
     if resp.status_code == 401:
         raise PermissionError("Unauthorized; token invalid or expired.")
     try:
@@ -119,99 +181,232 @@ def _api_get(path: str, token: str, params: Optional[Dict] = None) -> Dict:
     return resp.json()
 
 
-@st.cache_data(show_spinner=False, ttl=300)
-def fetch_sensor_list(
-    token: str, serial_filter: List[int], serial_to_site: Dict[int, Dict[str, object]], cache_bust: str
+def site_metadata_frame(serial_to_site: Dict[int, Dict[str, object]]) -> pd.DataFrame:
+    """Site metadata as a DataFrame indexed by serial, with the columns fetch_sensor_list adds."""
+    columns = {"name": "site", "icao": "icao", "airport": "airport", "country": "country", "lat": "latitude", "lon": "longitude"}
+    meta = pd.DataFrame.from_records(
+        list(serial_to_site.values()),
+        index=pd.Index(list(serial_to_site), dtype="int64", name="serial"),
+        columns=list(columns),
+    ).rename(columns=columns)
+    meta["latitude"] = pd.to_numeric(meta["latitude"], errors="coerce")
+    meta["longitude"] = pd.to_numeric(meta["longitude"], errors="coerce")
+    return meta
+
+
+def enrich_sensor_list(
+    df: pd.DataFrame, serial_filter: List[int], serial_to_site: Dict[int, Dict[str, object]]
 ) -> pd.DataFrame:
-    data = _api_get("/sensor/list", token)
-    df = pd.DataFrame(data)
+    """Filter a /sensor/list frame to the configured serials and join the site metadata onto it."""
     if df.empty or not serial_filter:
         return df
-    df["serial"] = df["serial"].apply(normalize_serial)
-    df = df[df["serial"].notna()].copy()
-    df["serial"] = df["serial"].astype(int)
+    df = df.copy()
+    serials = df["serial"].astype(str).str.strip()
+    # Same values normalize_serial accepts: integer strings only, not "123.0" or "1e3".
+    df["serial"] = pd.to_numeric(serials.where(serials.str.fullmatch(r"[+-]?\d+")), errors="coerce")
     df = df[df["serial"].isin(serial_filter)].copy()
-    df["site"] = df["serial"].apply(lambda s: serial_to_site.get(s, {}).get("name", ""))
-    df["icao"] = df["serial"].apply(lambda s: serial_to_site.get(s, {}).get("icao", ""))
-    df["airport"] = df["serial"].apply(lambda s: serial_to_site.get(s, {}).get("airport", ""))
-    df["country"] = df["serial"].apply(lambda s: serial_to_site.get(s, {}).get("country", ""))
-    df["latitude"] = df.apply(
-        lambda row: serial_to_site.get(row["serial"], {}).get("lat"), axis=1
-    )
-    df["longitude"] = df.apply(
-        lambda row: serial_to_site.get(row["serial"], {}).get("lon"), axis=1
-    )
-    df["latitude"] = df.apply(
-        lambda row: row["latitude"]
-        if pd.notnull(row["latitude"])
-        else (row["position"].get("latitude") if isinstance(row.get("position"), dict) else None),
-        axis=1,
-    )
-    df["longitude"] = df.apply(
-        lambda row: row["longitude"]
-        if pd.notnull(row["longitude"])
-        else (row["position"].get("longitude") if isinstance(row.get("position"), dict) else None),
-        axis=1,
-    )
+    df["serial"] = df["serial"].astype(int)
+    meta = site_metadata_frame(serial_to_site)
+    df = df.drop(columns=[c for c in meta.columns if c in df.columns]).join(meta, on="serial")
+    for column in ["site", "icao", "airport", "country"]:
+        df[column] = df[column].fillna("")
+    if "position" in df.columns:
+        # Fall back to the API-reported position where the metadata has no coordinates.
+        positions = pd.DataFrame.from_records(
+            [p if isinstance(p, dict) else {} for p in df["position"]], columns=["latitude", "longitude"], index=df.index
+        )
+        df["latitude"] = df["latitude"].fillna(pd.to_numeric(positions["latitude"], errors="coerce"))
+        df["longitude"] = df["longitude"].fillna(pd.to_numeric(positions["longitude"], errors="coerce"))
     df["added_dt"] = pd.to_datetime(df["added"], unit="s", utc=True, errors="coerce")
     df["last_seen_dt"] = pd.to_datetime(df["lastConnectionEvent"], unit="s", utc=True, errors="coerce")
     return df
 
 
-@st.cache_data(show_spinner=False, ttl=300)
+@counted(st.cache_data(show_spinner=False, ttl=300))
+def fetch_sensor_list(
+    token: str, serial_filter: List[int], serial_to_site: Dict[int, Dict[str, object]], cache_bust: str
+) -> pd.DataFrame:
+    return _load_sensor_list(token, serial_filter, serial_to_site, cache_bust)
+
+
+@disk_cached("sensor_list", ttl=300, ignore=("token",))
+def _load_sensor_list(
+    token: str, serial_filter: List[int], serial_to_site: Dict[int, Dict[str, object]], cache_bust: str
+) -> pd.DataFrame:
+    data = _api_get("/sensor/list", token)
+    return enrich_sensor_list(pd.DataFrame(data), serial_filter, serial_to_site)
+
+
+@st.cache_resource(show_spinner=False)
+def _msg_rate_cache() -> MsgRateCache:
+    return MsgRateCache()
+
+
 def fetch_msg_rates(token: str, serials: List[int], hours: int, cache_bust: str) -> pd.DataFrame:
     serials = [s for s in (normalize_serial(s) for s in serials) if s is not None]
     if not serials:
         return pd.DataFrame()
-    end = int(time.time())
-    begin = end - hours * 3600
-    params = {"serials": ",".join(map(str, serials)), "begin": begin, "end": end}
-    try:
-        payload = _api_get("/stats/msg-rates", token, params=params)
-    except Exception:
-        # Fallback to no params in case the endpoint rejects custom ranges
-        payload = _api_get("/stats/msg-rates", token, params={"serials": ",".join(map(str, serials))})
-    series = payload.get("series", {}) if isinstance(payload, dict) else {}
-    rows = []
-    for sid, values in series.items():
-        serial = normalize_serial(sid)
-        if serial is None:
-            continue
-        for item in values:
-            rows.append(
-                {
-                    "serial": serial,
-                    "ts": pd.to_datetime(item[0], unit="ms", utc=True),
-                    "rate": item[1],
-                }
-            )
-    return pd.DataFrame(rows)
+    cache = _msg_rate_cache()
+    disk = default_cache()
+    now = time.time()
+    # Series persisted by another worker or before a restart only need their tail fetched.
+    if disk is not None:
+        stored = disk.get_many("msg_rates", map(str, cache.missing(serials)))
+        cache.restore({int(serial): entry for serial, entry in stored.items()})
+    fetched: List[int] = []
+    # No lock is held while fetching, so a queued background refresh never holds up a page.
+    # New serials get only the requested window; seen ones only the points after their last cached timestamp.
+    for begin, group in cache.plan(serials, now, hours, newer_than=bust_time(cache_bust)).items():
+        params = {"serials": ",".join(map(str, group)), "begin": begin, "end": int(now)}
+        try:
+            payload = _api_get("/stats/msg-rates", token, params=params)
+        except RateLimited:
+            # Repeating the request without a range would only add to the throttling.
+            raise
+        except Exception:
+            # Fallback to no params in case the endpoint rejects custom ranges
+            payload = _api_get("/stats/msg-rates", token, params={"serials": ",".join(map(str, group))})
+        cache.merge(group, parse_msg_rates(payload), begin, now)
+        fetched.extend(group)
+    if disk is not None and fetched:
+        disk.set_many(
+            "msg_rates", {str(serial): entry for serial, entry in cache.export(fetched).items()}, MSG_RATE_RETENTION_HOURS * 3600
+        )
+    return cache.window(serials, hours, now)
+
+
+@st.cache_resource(show_spinner=False)
+def _coverage_cache() -> CoverageCache:
+    return CoverageCache(ttl=600, disk=default_cache())
+
+
+@st.cache_resource(show_spinner=False)
+def _coverage_archive() -> CoverageArchive:
+    return CoverageArchive()
 
 
-@st.cache_data(show_spinner=False, ttl=600)
-def fetch_coverage_polygon(token: str, serial: int, day: str, cache_bust: str) -> List[List[float]]:
+def _coverage_fetcher(token: str) -> PayloadFetcher:
+    # Background jobs have no script context to pass on.
+    ctx = get_script_run_ctx(suppress_warning=True)
+    priority = current_priority()
+
+    def _fetch(serials: List[int], days: List[str]) -> Dict:
+        # Worker threads need the script context for Streamlit's caches, and the caller's priority.
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        with request_priority(priority):
+            return _api_get("/range/days", token, params=range_days_params(serials, days))
+
+    return _fetch
+
+
+def fetch_coverage_polygon(token: str, serial: int, day: str, cache_bust: str) -> Polygon:
     serial_val = normalize_serial(serial)
     if serial_val is None:
-        return []
-    params = {"days": day, "serials": serial_val}
-    payload = _api_get("/range/days", token, params=params)
-    day_data = payload.get(day) if isinstance(payload, dict) else None
-    if not day_data:
-        return []
-    ranges = day_data[0].get("ranges", []) if isinstance(day_data, list) else []
-    if not ranges:
-        return []
-    # API returns [distance, lat, lon]
-    return [[r[2], r[1]] for r in ranges]
-
-
-def render_msg_chart(msg_df: pd.DataFrame, serial_order: List[int], label_lookup: Dict[int, str]) -> None:
+        return empty_polygon()
+    polygons: Dict = {}
+    for _keys, batch, exc in load_coverage(
+        _coverage_fetcher(token),
+        _coverage_cache(),
+        [serial_val],
+        [day],
+        newer_than=bust_time(cache_bust),
+        archive=_coverage_archive(),
+    ):
+        if exc is not None:
+            raise exc
+        polygons.update(batch)
+    return polygons.get((serial_val, day), empty_polygon())
+
+
+def fetch_coverage_polygons(
+    token: str, serials: List[int], day: str, cache_bust: str, max_workers: int = COVERAGE_MAX_WORKERS
+) -> Iterator[Tuple[int, Polygon, Optional[Exception]]]:
+    """Fetch coverage polygons for many serials in concurrent batches, yielding (serial, coords, error) as they complete."""
+    serial_vals = [s for s in (normalize_serial(s) for s in serials) if s is not None]
+    for keys, polygons, exc in load_coverage(
+        _coverage_fetcher(token),
+        _coverage_cache(),
+        serial_vals,
+        [day],
+        newer_than=bust_time(cache_bust),
+        max_workers=max_workers,
+        archive=_coverage_archive(),
+    ):
+        for key in keys:
+            yield key[0], polygons.get(key, empty_polygon()), exc
+
+
+def fetch_coverage_history(
+    token: str,
+    serials: List[int],
+    positions: Dict[int, Tuple[float, float]],
+    days: int,
+    cache_bust: str,
+    max_workers: int = COVERAGE_MAX_WORKERS,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Coverage statistics per sensor for the last `days` full days, plus error messages of failed batches.
+
+    Day batches are fetched concurrently; finished days come from the on-disk archive after their first fetch.
+    The statistics are cached per day range, so reruns of the view neither reread the archive nor
+    rebuild the trend; a result with failed batches is dropped so the next rerun retries them.
+    """
+    today = datetime.now(timezone.utc).date()
+    day_keys = [(today - timedelta(days=offset)).strftime("%Y%m%d") for offset in range(days, 0, -1)]
+    args = (token, serials, positions, day_keys, cache_bust, max_workers)
+    trend, errors = _coverage_history(*args)
+    if errors:
+        _coverage_history.clear(*args)
+    return trend, errors
+
+
+@counted(st.cache_data(show_spinner=False, ttl=600))
+def _coverage_history(
+    token: str,
+    serials: List[int],
+    positions: Dict[int, Tuple[float, float]],
+    day_keys: List[str],
+    cache_bust: str,
+    max_workers: int,
+) -> Tuple[pd.DataFrame, List[str]]:
+    polygons: Dict = {}
+    errors: List[str] = []
+    for _keys, batch, exc in load_coverage(
+        _coverage_fetcher(token),
+        _coverage_cache(),
+        serials,
+        day_keys,
+        newer_than=bust_time(cache_bust),
+        max_workers=max_workers,
+        archive=_coverage_archive(),
+    ):
+        if exc is not None:
+            errors.append(str(exc))
+        polygons.update(batch)
+    return coverage_trend(polygons, positions), errors
+
+
+@counted(st.cache_data(show_spinner=False, max_entries=4))
+def _msg_rates_csv(msg_df: pd.DataFrame) -> bytes:
+    return msg_df.to_csv(index=False).encode("utf-8")
+
+
+def render_msg_chart(
+    msg_df: pd.DataFrame,
+    serial_order: List[int],
+    label_lookup: Dict[int, str],
+    key: str = "msg",
+    width_px: int = CHART_WIDTH_PX,
+) -> None:
     if msg_df.empty:
         st.warning("No message rate data returned for the selected window.")
         return
-    data = msg_df.copy()
-    data["label"] = data["serial"].apply(lambda s: label_lookup.get(s, str(s)))
-    data["label"] = data["label"].astype(str)
+    # Only about one point per pixel is visible, so thin each series before it is inlined into the spec.
+    data = downsample_msg_rates(msg_df, width_px, MSG_DOWNSAMPLE_METHOD)
+    data = data[["ts", "rate"]].assign(
+        label=data["serial"].map(label_lookup).fillna(data["serial"].astype(str)).astype(str)
+    )
     domain = [label_lookup.get(s, str(s)) for s in serial_order]
     colors = [serial_hex(s) for s in serial_order]
     chart = (
@@ -234,57 +429,296 @@ def render_msg_chart(msg_df: pd.DataFrame, serial_order: List[int], label_lookup
         .properties(height=320)
     )
     st.altair_chart(chart, width="stretch")
+    st.caption(f"Showing {len(data):,} of {len(msg_df):,} points ({MSG_DOWNSAMPLE_METHOD} downsampling per sensor).")
+    st.download_button(
+        "Download raw message rates (CSV)",
+        _msg_rates_csv(msg_df),
+        file_name=f"msg_rates_{key}.csv",
+        mime="text/csv",
+        key=f"{key}_msg_rates_csv",
+    )
+
 
+@st.cache_resource(show_spinner=False)
+def _status_store() -> StatusStore:
+    return StatusStore()
 
-@st.cache_data(show_spinner=False, ttl=300)
+
+@counted(st.cache_data(show_spinner=False, ttl=300))
 def fetch_status_history(ph_token: str, months: int) -> pd.DataFrame:
     """Fetch online/offline history from PocketHost for the given lookback window."""
     if not ph_token:
         return pd.DataFrame()
     end = datetime.now(timezone.utc)
     start = end - timedelta(days=months * 30)
-    params = {
-        "perPage": 500,
-        "sort": "-polling_time",
-        "filter": f'polling_time > "{start.isoformat(timespec="seconds").replace("+00:00", "Z")}"',
-    }
-    url = f"{POCKETHOST_BASE}/api/collections/{POCKETHOST_COLLECTION}/records"
-    headers = {"Authorization": ph_token, "User-Agent": "opensky-sensor-dashboard"}
-    resp = requests.get(url, headers=headers, params=params, timeout=30)
-    resp.raise_for_status()
-    items = resp.json().get("items", [])
-    rows = []
-    for item in items:
-        rows.append(
-            {
-                "serial": normalize_serial(item.get("sensor_serial")),
-                "icao": item.get("sensor_site_airport_icao", ""),
-                "airport": item.get("sensor_site_airport_name", ""),
-                "country": item.get("sensor_site_country_name", ""),
-                "ts": pd.to_datetime(item.get("polling_time"), utc=True, errors="coerce"),
-                "online": bool(item.get("sensor_online", False)),
-            }
+    store = _status_store()
+    # Transition-mode records only mark changes, so also keep each sensor's last state before the window.
+    # While the prefetcher keeps the store synced, read it as-is instead of waiting on PocketBase.
+    max_age = 2 * PREFETCH_HISTORY_INTERVAL if PREFETCH_ENABLED else 0
+    store.sync(ph_token, since=start - max_record_gap(), max_age=max_age)
+    seeds = store.latest_records(before=start, since=start - max_record_gap())
+    timeline = rebuild_timeline(store.query(start, end), records_to_frame(list(seeds.values())), start, end)
+    # Where the timeline was closed; later records can end before it when sensors or the poller went quiet.
+    timeline.attrs["window_end"] = end.isoformat()
+    return timeline
+
+
+@counted(st.cache_data(show_spinner=False, ttl=300))
+def fetch_status_segments(ph_token: str, months: int) -> pd.DataFrame:
+    history = fetch_status_history(ph_token, months)
+    segments = status_segments(history)
+    segments.attrs.update(history.attrs)
+    return segments
+
+
+@counted(st.cache_data(show_spinner=False, ttl=300))
+def fetch_availability(ph_token: str, months: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Per-sensor and per-site availability KPIs for the lookback window."""
+    segments = fetch_status_segments(ph_token, months)
+    if segments.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    # Measure up to where the history was closed, not its last record, so a fleet or poller that
+    # stopped reporting shows up as a trailing data gap.
+    end = pd.Timestamp(segments.attrs.get("window_end") or segments["end"].max())
+    start = end - timedelta(days=months * 30)
+    return availability_stats(segments, start, end)
+
+
+def _prefetch_context() -> Tuple[str, str, List[int], Dict[int, Dict[str, object]]]:
+    """
+    Tokens and fleet metadata for background jobs, which have no page state to read them from.
+
+    Jobs run outside any script run, so they call the loaders below st.cache_data: Streamlit's
+    caches expect a script context, and the jobs refresh the shared disk tier anyway.
+    """
+    manager = _token_manager()
+    ph_token = _get_pockethost_token()
+    if not ph_token or manager is None:
+        raise RuntimeError("OpenSky or PocketBase credentials are not configured.")
+    _metadata_df, all_serials, serial_to_site, _monitor_sites = _load_sensor_metadata(ph_token, "stable")
+    return manager.token(), ph_token, all_serials, serial_to_site
+
+
+def _prefetch_sensor_list() -> pd.DataFrame:
+    token, _ph_token, all_serials, serial_to_site = _prefetch_context()
+    # A bust time of now makes the disk tier take the fresh list instead of a stored one.
+    return _load_sensor_list(token, all_serials, serial_to_site, str(time.time()))
+
+
+def _prefetch_msg_rates() -> None:
+    # Keeps the shared MsgRateCache current; pages read their windows from it locally.
+    token, _ph_token, all_serials, _serial_to_site = _prefetch_context()
+    fetch_msg_rates(token, all_serials, MSG_RATE_RETENTION_HOURS, "stable")
+
+
+def _prefetch_coverage() -> Tuple[str, Dict[int, Polygon]]:
+    """Yesterday's coverage polygons for every serial, as (day, {serial: polygon})."""
+    token, _ph_token, all_serials, _serial_to_site = _prefetch_context()
+    day = (datetime.now(timezone.utc).date() - timedelta(days=1)).strftime("%Y%m%d")
+    polygons: Dict[int, Polygon] = {}
+    errors: List[Exception] = []
+    for serial, polygon, exc in fetch_coverage_polygons(token, all_serials, day, "stable"):
+        if exc is not None:
+            errors.append(exc)
+        else:
+            polygons[serial] = polygon
+    if errors and not polygons:
+        raise errors[0]
+    return day, polygons
+
+
+def _prefetch_status_history() -> None:
+    _token, ph_token, _all_serials, _serial_to_site = _prefetch_context()
+    since = datetime.now(timezone.utc) - timedelta(days=HISTORY_MAX_MONTHS * 30) - max_record_gap()
+    _status_store().sync(ph_token, since=since)
+
+
+def _backfill(job: Callable[[], Any]) -> Callable[[], Any]:
+    """Run a background job's OpenSky requests at the lowest priority."""
+
+    def _run() -> Any:
+        with request_priority(BACKFILL):
+            return job()
+
+    return _run
+
+
+PREFETCH_JOBS: Dict[str, Tuple[Callable[[], Any], int]] = {
+    "sensor_list": (_prefetch_sensor_list, PREFETCH_FLEET_INTERVAL),
+    "msg_rates": (_prefetch_msg_rates, PREFETCH_MSG_RATE_INTERVAL),
+    "coverage": (_prefetch_coverage, PREFETCH_COVERAGE_INTERVAL),
+    "status_history": (_prefetch_status_history, PREFETCH_HISTORY_INTERVAL),
+}
+
+
+@st.cache_resource(show_spinner=False)
+def _prefetcher() -> Prefetcher:
+    """One background refresher per server process, shared by all sessions."""
+    prefetcher = Prefetcher()
+    prefetcher.start()
+    return prefetcher
+
+
+def warm_snapshot(name: str, force_refresh: bool) -> Optional[Snapshot]:
+    """The prefetched snapshot for a view, or None when the page has to load the data itself."""
+    if not PREFETCH_ENABLED:
+        return None
+    prefetcher = _prefetcher()
+    # Jobs start when a view first asks for them, so data for views nobody opens is never refreshed.
+    job, interval = PREFETCH_JOBS[name]
+    prefetcher.register(name, _backfill(job), interval)
+    if force_refresh:
+        return None
+    snapshot = prefetcher.get(name)
+    if snapshot is None or not snapshot.refreshed_at:
+        return None
+    return snapshot
+
+
+def render_data_age(snapshot: Optional[Snapshot]) -> None:
+    if snapshot is None:
+        return
+    age = int(time.time() - snapshot.refreshed_at)
+    updated = datetime.fromtimestamp(snapshot.refreshed_at, tz=timezone.utc).strftime("%H:%M:%S")
+    st.caption(f"Data as of {updated} UTC ({age // 60} min {age % 60} s ago, refreshed in the background).")
+    if snapshot.error:
+        st.caption(f"Last background refresh failed: {snapshot.error}")
+
+
+AVAILABILITY_COLUMNS = {
+    "uptime_pct": st.column_config.NumberColumn("Uptime %", format="%.2f"),
+    "outages": st.column_config.NumberColumn("Outages"),
+    "longest_outage_h": st.column_config.NumberColumn("Longest outage (h)", format="%.1f"),
+    "mtbf_h": st.column_config.NumberColumn("MTBF (h)", format="%.1f"),
+    "mttr_h": st.column_config.NumberColumn("MTTR (h)", format="%.1f"),
+    "data_gaps": st.column_config.NumberColumn("Data gaps"),
+    "gap_h": st.column_config.NumberColumn("Unknown (h)", format="%.1f"),
+}
+
+
+def render_availability(sensor_stats: pd.DataFrame, site_stats: pd.DataFrame) -> None:
+    if sensor_stats.empty:
+        st.caption("No availability data for the selected window.")
+        return
+    kpi_cols = list(AVAILABILITY_COLUMNS)
+    col1, col2, col3 = st.columns(3)
+    fleet_uptime = 100 * sensor_stats["online_h"].sum() / max(sensor_stats["known_h"].sum(), 1e-9)
+    col1.metric("Fleet uptime", f"{fleet_uptime:.2f}%")
+    col2.metric("Outages", f"{int(sensor_stats['outages'].sum())}")
+    col3.metric("Data gaps", f"{int(sensor_stats['data_gaps'].sum())}")
+    by_sensor, by_site = st.tabs(["Per sensor", "Per site"])
+    with by_sensor:
+        st.dataframe(
+            sensor_stats[["serial", "site", "country", *kpi_cols]].sort_values("uptime_pct"),
+            hide_index=True,
+            width="stretch",
+            column_config=AVAILABILITY_COLUMNS,
         )
-    df = pd.DataFrame(rows)
-    df = df[df["serial"].notna()].copy()
-    df["serial"] = df["serial"].astype(int)
-    df = df[df["ts"].notna()]
-    return df
+    with by_site:
+        st.dataframe(
+            site_stats[["site", "country", "sensors", *kpi_cols]].sort_values("uptime_pct"),
+            hide_index=True,
+            width="stretch",
+            column_config=AVAILABILITY_COLUMNS,
+        )
+
+
+def render_status_segments(segments: pd.DataFrame) -> None:
+    sensors = segments["label"].nunique()
+    chart = (
+        alt.Chart(segments)
+        .mark_bar()
+        .encode(
+            x=alt.X("start:T", title="Timestamp (UTC)"),
+            x2="end:T",
+            y=alt.Y("label:N", title=None, axis=alt.Axis(labelLimit=280)),
+            color=alt.Color(
+                "status_txt:N",
+                legend=alt.Legend(title="Status"),
+                scale=alt.Scale(domain=["Online", "Offline"], range=["#2a9d8f", "#e76f51"]),
+            ),
+            tooltip=[
+                alt.Tooltip("label:N", title="Sensor"),
+                alt.Tooltip("status_txt:N", title="Status"),
+                alt.Tooltip("start:T", title="From (UTC)", format="%Y-%m-%d %H:%M"),
+                alt.Tooltip("end:T", title="Until (UTC)", format="%Y-%m-%d %H:%M"),
+                alt.Tooltip("hours:Q", title="Duration (h)"),
+            ],
+        )
+        .properties(height=max(60, 32 * sensors))
+    )
+    st.altair_chart(chart, width="stretch")
 
 
-def render_map(sensor_df: pd.DataFrame, coverage_coords: List[List[float]], coverage_serial: Optional[int]) -> None:
+COVERAGE_TREND_COLUMNS = {
+    "day": st.column_config.DateColumn("Day (UTC)"),
+    "max_range_km": st.column_config.NumberColumn("Max range (km)", format="%.0f"),
+    "area_km2": st.column_config.NumberColumn("Area (km²)", format="%.0f"),
+    "baseline_area_km2": st.column_config.NumberColumn("Baseline area (km²)", format="%.0f"),
+    "area_change_pct": st.column_config.NumberColumn("Area vs previous day %", format="%.1f"),
+}
+
+
+def render_coverage_trend(trend: pd.DataFrame, serial_order: List[int]) -> None:
+    """Max-range line per sensor, with days whose area fell below the baseline marked in red."""
+    domain = [str(s) for s in serial_order]
+    base = alt.Chart(trend.assign(sensor=trend["serial"].astype(str))).encode(
+        x=alt.X("day:T", title="Day (UTC)"),
+        y=alt.Y("max_range_km:Q", title="Max range (km)"),
+        tooltip=[
+            alt.Tooltip("sensor:N", title="Sensor"),
+            alt.Tooltip("day:T", title="Day (UTC)", format="%Y-%m-%d"),
+            alt.Tooltip("max_range_km:Q", title="Max range (km)", format=".0f"),
+            alt.Tooltip("area_km2:Q", title="Area (km²)", format=",.0f"),
+            alt.Tooltip("area_change_pct:Q", title="Area vs previous day (%)", format=".1f"),
+        ],
+    )
+    lines = base.mark_line(point=True).encode(
+        color=alt.Color(
+            "sensor:N",
+            scale=alt.Scale(domain=domain, range=[serial_hex(s) for s in serial_order]),
+            legend=alt.Legend(title="Sensor"),
+        )
+    )
+    degraded = base.transform_filter(alt.datum.degraded).mark_point(color="#e76f51", size=90, filled=True)
+    st.altair_chart((lines + degraded).properties(height=260), width="stretch")
+
+
+def polygon_view(
+    polygons: List[Polygon], center_lat: float, center_lon: float, max_zoom: float, width_px: int = CHART_WIDTH_PX
+) -> Tuple[List[List[List[float]]], float, float, float]:
+    """
+    Fit the initial map view to the polygons and simplify them for that zoom.
+
+    Returns (encoded polygons, center_lat, center_lon, zoom). Each ring keeps only the vertices
+    that move it by more than GEOMETRY_TOLERANCE_PX pixels at the initial zoom, and is sent as
+    rounded lists to keep the deck payload small.
+    """
+    center = centroid(polygons)
+    box = bounds(polygons)
+    if center is None or box is None:
+        return [[] for _ in polygons], center_lat, center_lon, max_zoom
+    center_lon, center_lat = center
+    zoom = fit_zoom(box, width_px, MAP_HEIGHT_PX, max_zoom)
+    tolerance = zoom_tolerance(zoom, center_lat)
+    return [encode_polygon(simplify_cached(p, tolerance)) for p in polygons], center_lat, center_lon, zoom
+
+
+def render_map(sensor_df: pd.DataFrame, coverage_coords: Polygon, coverage_serial: Optional[int]) -> None:
     layers = []
     centers = sensor_df[["latitude", "longitude"]].dropna()
     center_lat = centers["latitude"].mean() if not centers.empty else 0.0
     center_lon = centers["longitude"].mean() if not centers.empty else 0.0
+    zoom = 5.0
 
-    if coverage_coords:
+    if len(coverage_coords):
         fill_color = serial_color(coverage_serial, 80) if coverage_serial is not None else [255, 191, 121, 70]
         line_color = serial_color(coverage_serial, 200) if coverage_serial is not None else [240, 120, 50]
+        (coords,), center_lat, center_lon, zoom = polygon_view([coverage_coords], center_lat, center_lon, zoom)
         layers.append(
             pdk.Layer(
                 "PolygonLayer",
-                data=[{"coords": coverage_coords, "fill_color": fill_color, "line_color": line_color}],
+                data=[{"coords": coords, "fill_color": fill_color, "line_color": line_color}],
                 get_polygon="coords",
                 stroked=True,
                 filled=True,
@@ -293,10 +727,6 @@ def render_map(sensor_df: pd.DataFrame, coverage_coords: List[List[float]], cove
                 line_width_min_pixels=2,
             )
         )
-        poly_lats = [c[1] for c in coverage_coords]
-        poly_lons = [c[0] for c in coverage_coords]
-        center_lat = sum(poly_lats) / len(poly_lats)
-        center_lon = sum(poly_lons) / len(poly_lons)
 
     if not sensor_df.empty:
         if "color" not in sensor_df.columns:
@@ -322,7 +752,7 @@ def render_map(sensor_df: pd.DataFrame, coverage_coords: List[List[float]], cove
     deck = pdk.Deck(
         map_provider=None,
         map_style="https://basemaps.cartocdn.com/gl/positron-gl-style/style.json",
-        initial_view_state=pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=5, pitch=30),
+        initial_view_state=pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=zoom, pitch=30),
         layers=layers,
         tooltip={"text": "Serial: {serial}\nSite: {site}\nOnline: {online}\nLast seen: {last_seen_dt}"},
     )
@@ -334,15 +764,19 @@ def render_map_with_polygons(sensor_df: pd.DataFrame, coverage_polygons: List[Di
     centers = sensor_df[["latitude", "longitude"]].dropna()
     center_lat = centers["latitude"].mean() if not centers.empty else 0.0
     center_lon = centers["longitude"].mean() if not centers.empty else 0.0
+    zoom = 4.5
 
-    polygons = [poly for poly in coverage_polygons if poly.get("coords")]
+    polygons = [poly for poly in coverage_polygons if len(poly.get("coords", ()))]
     if polygons:
+        encoded, center_lat, center_lon, zoom = polygon_view(
+            [poly["coords"] for poly in polygons], center_lat, center_lon, zoom
+        )
         poly_data = []
-        for poly in polygons:
+        for poly, coords in zip(polygons, encoded):
             serial = normalize_serial(poly.get("serial"))
             poly_data.append(
                 {
-                    "coords": poly.get("coords"),
+                    "coords": coords,
                     "fill_color": serial_color(serial, 70) if serial is not None else [121, 191, 255, 60],
                     "line_color": serial_color(serial, 200) if serial is not None else [40, 120, 200],
                 }
@@ -359,11 +793,6 @@ def render_map_with_polygons(sensor_df: pd.DataFrame, coverage_polygons: List[Di
                 line_width_min_pixels=2,
             )
         )
-        poly_lats = [c[1] for poly in polygons for c in poly.get("coords", [])]
-        poly_lons = [c[0] for poly in polygons for c in poly.get("coords", [])]
-        if poly_lats and poly_lons:
-            center_lat = sum(poly_lats) / len(poly_lats)
-            center_lon = sum(poly_lons) / len(poly_lons)
 
     if not sensor_df.empty:
         df = sensor_df.copy()
@@ -389,18 +818,452 @@ def render_map_with_polygons(sensor_df: pd.DataFrame, coverage_polygons: List[Di
     deck = pdk.Deck(
         map_provider=None,
         map_style="https://basemaps.cartocdn.com/gl/positron-gl-style/style.json",
-        initial_view_state=pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=4.5, pitch=30),
+        initial_view_state=pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=zoom, pitch=30),
         layers=layers,
         tooltip={"text": "Serial: {serial}\nSite: {site}\nOnline: {online}\nLast seen: {last_seen_dt}"},
     )
     st.pydeck_chart(deck, width="stretch")
 
 
+@st.cache_resource(show_spinner=False)
+def _metrics_server() -> Optional[str]:
+    """Expose the metrics registry on METRICS_PORT for a Prometheus scraper (once per process); returns an error message."""
+    try:
+        serve(METRICS_PORT)
+    except OSError as exc:
+        return f"Metrics endpoint could not listen on port {METRICS_PORT}: {exc}"
+    return None
+
+
+@st.fragment
+def render_operations() -> None:
+    """API latency, errors and throttling, cache hit ratios and rate-limit queues for this server process."""
+    st.subheader("OpenSky API")
+    endpoints = registry.endpoint_summary()
+    if not endpoints:
+        st.caption("No OpenSky API requests yet.")
+    else:
+        st.caption(
+            "Totals since the server started; latency percentiles over the last "
+            f"{METRICS_BUFFER_SIZE} requests. Errors include 429 responses, which are also counted as throttled."
+        )
+        st.dataframe(pd.DataFrame.from_dict(endpoints, orient="index").rename_axis("endpoint"), width="stretch")
+    flight = _single_flight().stats()
+    st.caption(
+        f"GETs requested: {flight['calls']}, sent upstream: {flight['executed']}, "
+        f"coalesced with an identical request in flight: {flight['coalesced']}."
+    )
+    queues = _scheduler().stats()
+    if queues:
+        st.markdown("**Rate-limit queues** (waits in seconds)")
+        st.dataframe(pd.DataFrame.from_dict(queues, orient="index").rename_axis("endpoint"), width="stretch")
+
+    st.subheader("Caches")
+    caches = registry.cache_summary()
+    if caches:
+        st.dataframe(pd.DataFrame.from_dict(caches, orient="index").rename_axis("function"), width="stretch")
+
+    st.subheader("Recent requests")
+    recent = registry.recent(200)
+    if recent:
+        recent_df = pd.DataFrame(recent, columns=list(RequestSample._fields))
+        recent_df["ts"] = pd.to_datetime(recent_df["ts"], unit="s", utc=True)
+        recent_df["seconds"] = recent_df["seconds"].round(3)
+        st.dataframe(recent_df, hide_index=True, width="stretch")
+    else:
+        st.caption("No requests recorded yet.")
+
+    st.download_button(
+        "Download metrics (Prometheus text format)",
+        registry.prometheus(),
+        file_name="metrics.prom",
+        mime="text/plain",
+        key="metrics_prometheus",
+    )
+    if METRICS_PORT:
+        error = _metrics_server()
+        if error:
+            st.warning(error)
+        else:
+            st.caption(f"Also served for scraping at :{METRICS_PORT}/metrics.")
+
+
+def _opensky_token() -> str:
+    """A current OpenSky token; fragments ask for it on every rerun rather than keeping the one from the last full run."""
+    manager = _token_manager()
+    if manager is None:
+        raise RuntimeError("OpenSky credentials are not configured.")
+    return manager.token()
+
+
+def load_fleet(cache_bust: str) -> Tuple[pd.DataFrame, Optional[Snapshot]]:
+    """The enriched sensor list, plus its snapshot when it came from the prefetcher."""
+    snapshot = warm_snapshot("sensor_list", cache_bust != "stable")
+    if snapshot is not None:
+        return snapshot.value, snapshot
+    return fetch_sensor_list(_opensky_token(), ALL_SERIALS, SERIAL_TO_SITE, cache_bust), None
+
+
+# Each view below is a fragment: its own widgets rerun only that view, and every input it
+# depends on is either an argument (fixed until the next full run), read through the shared
+# caches and snapshots, or the run's cache_bust from _cache_bust(), so a rerun never needs
+# state computed by another view.
+
+
+def _cache_bust() -> str:
+    """
+    The cache_bust for this run: the refresh time during the full run "Refresh now" started, else "stable".
+
+    Fragment reruns keep the arguments of the last full run, so the bust is read from session
+    state instead; main() resets it once the page is drawn, and later reruns use the snapshots.
+    """
+    return st.session_state.get("cache_bust", "stable")
+
+
+def _restore_setting(key: str, default: Any, options: Optional[List[Any]] = None) -> None:
+    """
+    Seed a view's widget from its saved setting before the widget is drawn.
+
+    Streamlit drops the state of widgets that are not drawn on a run, so without this a view's
+    settings would reset whenever another view is selected. Widgets save their value with
+    on_change=_save_setting; a saved value no longer among `options` falls back to `default`.
+    """
+    if key in st.session_state:
+        return
+    value = st.session_state.get(f"saved_{key}", default)
+    st.session_state[key] = value if options is None or value in options else default
+
+
+def _save_setting(key: str) -> None:
+    st.session_state[f"saved_{key}"] = st.session_state[key]
+
+
+@st.fragment(run_every=HEADER_REFRESH_SECONDS or None)
+def render_header() -> None:
+    """Fleet-wide tiles, refreshed on their own timer without rerunning the page."""
+    cache_bust = _cache_bust()
+    try:
+        sensors_df, snapshot = load_fleet(cache_bust)
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Sensor list unavailable: {exc}")
+        return
+    if sensors_df.empty:
+        return
+    online_count = int(sensors_df["online"].sum())
+    last_seen = sensors_df["last_seen_dt"].max()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Sensors", f"{len(sensors_df)}")
+    col2.metric("Online", f"{online_count}")
+    col3.metric("Offline", f"{len(sensors_df) - online_count}")
+    col4.metric("Latest contact (UTC)", last_seen.strftime("%Y-%m-%d %H:%M") if pd.notnull(last_seen) else "n/a")
+    render_data_age(snapshot)
+
+
+@st.fragment
+def site_view() -> None:
+    cache_bust = _cache_bust()
+    st.subheader("Single site view")
+    col_site, col_serial, col_day, col_rate = st.columns(4)
+    sites = sorted(MONITOR_SITES.keys())
+    _restore_setting("site_select", sites[0], sites)
+    site_choice = col_site.selectbox(
+        "Preset site", sites, key="site_select", on_change=_save_setting, args=("site_select",)
+    )
+    selected_serials = [
+        s for s in (normalize_serial(s) for s in MONITOR_SITES[site_choice]["sensors"]) if s is not None
+    ]
+    serial_options = selected_serials if selected_serials else ["No sensors"]
+    _restore_setting("site_coverage_serial", serial_options[0], serial_options)
+    coverage_serial = col_serial.selectbox(
+        "Sensor serial",
+        serial_options,
+        key="site_coverage_serial",
+        on_change=_save_setting,
+        args=("site_coverage_serial",),
+    )
+    _restore_setting("site_coverage_day", datetime.now(timezone.utc).date() - timedelta(days=1))
+    coverage_day = col_day.date_input(
+        "Coverage day",
+        key="site_coverage_day",
+        help="Uses /range/days endpoint for the chosen sensor.",
+        on_change=_save_setting,
+        args=("site_coverage_day",),
+    )
+    _restore_setting("site_rate_hours", 24)
+    rate_hours = col_rate.slider(
+        "Msg rate window (hours)", 1, 72, step=1, key="site_rate_hours", on_change=_save_setting, args=("site_rate_hours",)
+    )
+    st.caption("Monitoring the configured sensor with coverage, status, and message rates.")
+    st.caption(f"Site: {site_choice} | Serials: {', '.join(map(str, selected_serials))}")
+
+    try:
+        sensors_df, fleet_snapshot = load_fleet(cache_bust)
+        token = _opensky_token()
+    except Exception as exc:  # noqa: BLE001
+        st.error(str(exc))
+        return
+    msg_snapshot = warm_snapshot("msg_rates", cache_bust != "stable")
+
+    site_df = sensors_df[sensors_df["serial"].isin(selected_serials)].copy()
+    if site_df.empty:
+        st.warning("The selected site has no matching sensors in API results.")
+    else:
+        online_count = int(site_df["online"].sum())
+        last_seen = site_df["last_seen_dt"].max()
+        st.subheader("Site snapshot")
+        render_data_age(fleet_snapshot)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Sensors in site", f"{len(site_df)}")
+        col2.metric("Online", f"{online_count}")
+        col3.metric("Latest contact (UTC)", last_seen.strftime("%Y-%m-%d %H:%M") if pd.notnull(last_seen) else "n/a")
+
+        st.subheader("Sensor map")
+        coverage_coords = empty_polygon()
+        try:
+            coverage_coords = fetch_coverage_polygon(
+                token, coverage_serial, coverage_day.strftime("%Y%m%d"), cache_bust
+            )
+        except Exception as exc:  # noqa: BLE001
+            st.error(f"Coverage polygon unavailable: {exc}")
+        render_map(site_df, coverage_coords, coverage_serial)
+
+        st.subheader("Message rates")
+        msg_df = pd.DataFrame()
+        if msg_snapshot is not None:
+            msg_df = _msg_rate_cache().window(selected_serials, rate_hours, time.time())
+            render_data_age(msg_snapshot)
+        else:
+            with st.spinner("Loading message rates..."):
+                try:
+                    msg_df = fetch_msg_rates(token, selected_serials, rate_hours, cache_bust)
+                except Exception as exc:  # noqa: BLE001
+                    st.error(f"Message rates unavailable: {exc}")
+
+        if not msg_df.empty:
+            msg_df = msg_df.merge(
+                pd.DataFrame(
+                    [{"serial": s, "site": SERIAL_TO_SITE.get(s, {}).get("name", site_choice)} for s in selected_serials]
+                ),
+                on="serial",
+                how="left",
+            )
+            msg_df = msg_df.sort_values("ts")
+        render_msg_chart(
+            msg_df,
+            selected_serials,
+            {s: f"{s} ({SERIAL_TO_SITE.get(s, {}).get('name', site_choice)})" for s in selected_serials},
+            key="site",
+        )
+
+    st.subheader("Sensor details")
+    display_cols = ["serial", "site", "type", "online", "latitude", "longitude", "added_dt", "last_seen_dt"]
+    with st.spinner("Loading sensor details..."):
+        st.dataframe(site_df[display_cols], hide_index=True, width="stretch")
+
+
+@st.fragment
+def all_sensors_view() -> None:
+    cache_bust = _cache_bust()
+    st.subheader("All sensors")
+    col_all_day, col_all_rate = st.columns(2)
+    _restore_setting("all_coverage_day", datetime.now(timezone.utc).date() - timedelta(days=1))
+    all_coverage_day = col_all_day.date_input(
+        "Coverage day (all)",
+        key="all_coverage_day",
+        help="Fetches /range/days for each configured sensor.",
+        on_change=_save_setting,
+        args=("all_coverage_day",),
+    )
+    _restore_setting("all_rate_hours", 24)
+    all_rate_hours = col_all_rate.slider(
+        "Msg rate window (hours)", 1, 72, step=1, key="all_rate_hours", on_change=_save_setting, args=("all_rate_hours",)
+    )
+    st.caption("Monitoring the configured sensor fleet with coverage, status, and message rates.")
+
+    try:
+        sensors_df, _fleet_snapshot = load_fleet(cache_bust)
+        token = _opensky_token()
+    except Exception as exc:  # noqa: BLE001
+        st.error(str(exc))
+        return
+    force_refresh = cache_bust != "stable"
+    coverage_snapshot = warm_snapshot("coverage", force_refresh)
+    msg_snapshot = warm_snapshot("msg_rates", force_refresh)
+
+    st.subheader("Coverage map (all sensors)")
+    coverage_polygons: List[Dict[str, object]] = []
+    # Fleet-wide fetches queue behind the site view of any concurrent session.
+    with request_priority(BULK):
+        map_placeholder = st.empty()
+        rendered_count = 0
+        last_render = time.monotonic()
+        all_coverage_key = all_coverage_day.strftime("%Y%m%d")
+        if coverage_snapshot is not None and coverage_snapshot.value[0] == all_coverage_key:
+            render_data_age(coverage_snapshot)
+            coverage_source = ((serial, polygon, None) for serial, polygon in coverage_snapshot.value[1].items())
+        else:
+            coverage_source = fetch_coverage_polygons(token, ALL_SERIALS, all_coverage_key, cache_bust)
+        # A failed batch reports the same error for each of its serials; warn once per batch.
+        failed_batches: Dict[int, Tuple[Exception, List[int]]] = {}
+        with st.spinner("Fetching coverage polygons for all sensors..."):
+            for serial, polygon, exc in coverage_source:
+                if exc is not None:
+                    failed_batches.setdefault(id(exc), (exc, []))[1].append(serial)
+                    continue
+                if not len(polygon):
+                    continue
+                coverage_polygons.append({"serial": serial, "coords": polygon})
+                if time.monotonic() - last_render >= COVERAGE_STREAM_INTERVAL:
+                    with map_placeholder.container():
+                        render_map_with_polygons(sensors_df, coverage_polygons)
+                    rendered_count = len(coverage_polygons)
+                    last_render = time.monotonic()
+        if rendered_count != len(coverage_polygons) or not coverage_polygons:
+            with map_placeholder.container():
+                render_map_with_polygons(sensors_df, coverage_polygons)
+        for exc, serials in failed_batches.values():
+            st.warning(f"Coverage unavailable for {', '.join(map(str, serials))}: {exc}")
+
+        st.subheader("Message rates (all sensors)")
+        all_msg_df = pd.DataFrame()
+        if msg_snapshot is not None:
+            all_msg_df = _msg_rate_cache().window(ALL_SERIALS, all_rate_hours, time.time())
+            render_data_age(msg_snapshot)
+        else:
+            with st.spinner("Loading message rates..."):
+                try:
+                    all_msg_df = fetch_msg_rates(token, ALL_SERIALS, all_rate_hours, cache_bust)
+                except Exception as exc:  # noqa: BLE001
+                    st.error(f"Message rates unavailable: {exc}")
+
+        if not all_msg_df.empty:
+            all_msg_df = all_msg_df.merge(
+                pd.DataFrame(
+                    [{"serial": s, "site": SERIAL_TO_SITE.get(s, {}).get("name", "")} for s in ALL_SERIALS]
+                ),
+                on="serial",
+                how="left",
+            )
+            all_msg_df = all_msg_df.sort_values("ts")
+        render_msg_chart(
+            all_msg_df,
+            ALL_SERIALS,
+            {s: f"{s} ({SERIAL_TO_SITE.get(s, {}).get('name', '')})".strip() for s in ALL_SERIALS},
+            key="all",
+        )
+
+    st.subheader("All sensor details")
+    display_cols = ["serial", "site", "type", "online", "latitude", "longitude", "added_dt", "last_seen_dt"]
+    with st.spinner("Loading sensor details..."):
+        st.dataframe(
+            sensors_df[display_cols].sort_values(["site", "serial"]),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+
+@st.fragment
+def status_history_view(ph_token: str) -> None:
+    cache_bust = _cache_bust()
+    st.subheader("Sensor status history")
+    _restore_setting("history_months", 3)
+    history_months = st.slider(
+        "History window (months)",
+        1,
+        HISTORY_MAX_MONTHS,
+        step=1,
+        key="history_months",
+        on_change=_save_setting,
+        args=("history_months",),
+    )
+    render_data_age(warm_snapshot("status_history", cache_bust != "stable"))
+    if not ph_token:
+        st.warning("Set POCKETHOST_ADMIN_TOKEN (or pockethost_admin_token in secrets) to view history.")
+    else:
+        with st.spinner("Fetching status history..."):
+            segments = fetch_status_segments(ph_token, history_months)
+        if segments.empty:
+            st.warning("No status history found for the selected window.")
+        else:
+            st.subheader("Availability")
+            render_availability(*fetch_availability(ph_token, history_months))
+            st.subheader("Status timeline")
+            segments["label"] = segments["serial"].astype(str) + " (" + segments["icao"] + ") - " + segments["airport"]
+            segments["site_group"] = segments["icao"] + " - " + segments["airport"]
+            segments["status_txt"] = np.where(segments["online"], "Online", "Offline")
+            segments["hours"] = ((segments["end"] - segments["start"]) / pd.Timedelta(hours=1)).round(1)
+            segments = segments.sort_values(["country", "site_group", "serial", "start"])
+            for country, country_df in segments.groupby("country", sort=True):
+                st.markdown(f"## {country}")
+                site_frames = list(country_df.groupby("site_group", sort=True))
+                for idx in range(0, len(site_frames), 2):
+                    cols = st.columns(2)
+                    for offset, (site_name, site_df) in enumerate(site_frames[idx : idx + 2]):
+                        with cols[offset]:
+                            st.markdown(f"### {site_name}")
+                            render_status_segments(site_df)
+
+
+@st.fragment
+def coverage_history_view() -> None:
+    cache_bust = _cache_bust()
+    st.subheader("Coverage history")
+    _restore_setting("coverage_days", 30)
+    coverage_days = st.slider(
+        "Coverage history (days)", 7, 90, step=1, key="coverage_days", on_change=_save_setting, args=("coverage_days",)
+    )
+    st.caption(
+        f"Daily coverage area and maximum range over the last {coverage_days} full days. "
+        "Red points mark days whose area fell well below the sensor's recent median."
+    )
+    try:
+        sensors_df, _fleet_snapshot = load_fleet(cache_bust)
+        token = _opensky_token()
+    except Exception as exc:  # noqa: BLE001
+        st.error(str(exc))
+        return
+    positions = {
+        int(row.serial): (row.latitude, row.longitude)
+        for row in sensors_df[["serial", "latitude", "longitude"]].itertuples(index=False)
+    }
+    with st.spinner("Fetching coverage history..."), request_priority(BACKFILL):
+        trend, errors = fetch_coverage_history(token, ALL_SERIALS, positions, coverage_days, cache_bust)
+    if errors:
+        st.warning(f"{len(errors)} coverage request(s) failed: {errors[0]}")
+    if trend["area_km2"].notna().sum() == 0:
+        st.warning("No coverage history returned for the selected window.")
+    else:
+        latest = trend.dropna(subset=["area_km2"]).groupby("serial").tail(1)
+        flagged = latest[latest["degraded"]].copy()
+        col1, col2 = st.columns(2)
+        col1.metric("Sensors with coverage", f"{latest['serial'].nunique()}")
+        col2.metric("Degraded on latest day", f"{len(flagged)}")
+        if not flagged.empty:
+            flagged["site"] = flagged["serial"].map(lambda s: SERIAL_TO_SITE.get(s, {}).get("name", ""))
+            st.dataframe(
+                flagged[["serial", "site", *COVERAGE_TREND_COLUMNS]],
+                hide_index=True,
+                width="stretch",
+                column_config=COVERAGE_TREND_COLUMNS,
+            )
+        trend["country"] = trend["serial"].map(lambda s: SERIAL_TO_SITE.get(s, {}).get("country", ""))
+        trend["site_group"] = trend["serial"].map(lambda s: SERIAL_TO_SITE.get(s, {}).get("name", str(s)))
+        for country, country_df in trend.groupby("country", sort=True):
+            st.markdown(f"## {country}")
+            site_frames = list(country_df.groupby("site_group", sort=True))
+            for idx in range(0, len(site_frames), 2):
+                cols = st.columns(2)
+                for offset, (site_name, site_df) in enumerate(site_frames[idx : idx + 2]):
+                    with cols[offset]:
+                        st.markdown(f"### {site_name}")
+                        render_coverage_trend(site_df, sorted(site_df["serial"].unique()))
+
+
 def main() -> None:
     st.set_page_config(page_title="OpenSky Sensor Dashboard", layout="wide")
+    if METRICS_PORT:
+        _metrics_server()
 
-    st.session_state.setdefault("api_logs", [])
-    st.session_state.setdefault("log_api", True)
     force_refresh_flag = st.session_state.pop("force_refresh", False)
 
     client_id, client_secret = _get_credentials()
@@ -423,9 +1286,6 @@ def main() -> None:
     MONITOR_SITES = monitor_sites
     set_serial_colors(ALL_SERIALS)
 
-    if force_refresh_flag:
-        st.session_state["api_logs"] = []
-
     with st.sidebar:
         st.markdown(
             """
@@ -446,38 +1306,7 @@ def main() -> None:
             st.sidebar.image(logo_path, width="stretch")
         st.title("OpenSky Sensor Dashboard")
 
-        st.subheader("Site settings")
-        site_choice = st.selectbox("Preset site", sorted(MONITOR_SITES.keys()), key="site_select")
-        selected_serials = [
-            s for s in (normalize_serial(s) for s in MONITOR_SITES[site_choice]["sensors"]) if s is not None
-        ]
-        col_serial, col_day = st.columns(2)
-        coverage_serial = col_serial.selectbox(
-            "Sensor serial", selected_serials if selected_serials else ["No sensors"], key="site_coverage_serial"
-        )
-        coverage_day = col_day.date_input(
-            "Coverage day",
-            value=datetime.now(timezone.utc).date() - timedelta(days=1),
-            key="site_coverage_day",
-            help="Uses /range/days endpoint for the chosen sensor.",
-        )
-        rate_hours = st.slider("Msg rate window (hours)", 1, 72, 24, 1, key="site_rate_hours")
-
-        st.subheader("All sensors settings")
-        col_all_day, col_all_rate = st.columns(2)
-        all_coverage_day = col_all_day.date_input(
-            "Coverage day (all)",
-            value=datetime.now(timezone.utc).date() - timedelta(days=1),
-            key="all_coverage_day",
-            help="Fetches /range/days for each configured sensor.",
-        )
-        all_rate_hours = col_all_rate.slider(
-            "Msg rate window (hours)", 1, 72, 24, 1, key="all_rate_hours"
-        )
-
-        st.subheader("Status history")
-        history_months = st.slider("History window (months)", 1, 12, 3, 1, key="history_months")
-
+        st.caption("Each view has its own settings; changing them only reloads that view.")
         st.button(
             "Refresh now",
             type="primary",
@@ -491,200 +1320,41 @@ def main() -> None:
         return
 
     try:
-        token = fetch_token(client_id, client_secret, cache_bust)
+        get_manager(client_id, client_secret).token()
     except Exception as exc:  # noqa: BLE001
         st.error(f"Failed to obtain OAuth token: {exc}")
         return
 
-    sensors_df = fetch_sensor_list(token, ALL_SERIALS, SERIAL_TO_SITE, cache_bust)
+    if PREFETCH_ENABLED and force_refresh_flag:
+        _prefetcher().trigger()
+    try:
+        sensors_df, _fleet_snapshot = load_fleet(cache_bust)
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Sensor list unavailable: {exc}")
+        return
     if sensors_df.empty:
         st.warning("No sensor metadata returned for the configured serials.")
         return
 
-    tab_site, tab_all, tab_history = st.tabs(["Site view", "All sensors", "Status history"])
-
-    with tab_site:
-        st.subheader("Single site view")
-        st.caption("Monitoring the configured sensor with coverage, status, and message rates.")
-        st.caption(f"Site: {site_choice} | Serials: {', '.join(map(str, selected_serials))}")
-
-        site_df = sensors_df[sensors_df["serial"].isin(selected_serials)].copy()
-        if site_df.empty:
-            st.warning("The selected site has no matching sensors in API results.")
-        else:
-            online_count = int(site_df["online"].sum())
-            last_seen = site_df["last_seen_dt"].max()
-            st.subheader("Fleet snapshot")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Sensors in site", f"{len(site_df)}")
-            col2.metric("Online", f"{online_count}")
-            col3.metric("Latest contact (UTC)", last_seen.strftime("%Y-%m-%d %H:%M") if pd.notnull(last_seen) else "n/a")
-
-            st.subheader("Sensor map")
-            coverage_coords: List[List[float]] = []
-            try:
-                coverage_coords = fetch_coverage_polygon(
-                    token, coverage_serial, coverage_day.strftime("%Y%m%d"), cache_bust
-                )
-            except Exception as exc:  # noqa: BLE001
-                st.error(f"Coverage polygon unavailable: {exc}")
-            render_map(site_df, coverage_coords, coverage_serial)
-
-            st.subheader("Message rates")
-            msg_df = pd.DataFrame()
-            with st.spinner("Loading message rates..."):
-                try:
-                    msg_df = fetch_msg_rates(token, selected_serials, rate_hours, cache_bust)
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Message rates unavailable: {exc}")
-
-            if not msg_df.empty:
-                msg_df = msg_df.merge(
-                    pd.DataFrame(
-                        [{"serial": s, "site": SERIAL_TO_SITE.get(s, {}).get("name", site_choice)} for s in selected_serials]
-                    ),
-                    on="serial",
-                    how="left",
-                )
-                msg_df = msg_df.sort_values("ts")
-            render_msg_chart(
-                msg_df,
-                selected_serials,
-                {s: f"{s} ({SERIAL_TO_SITE.get(s, {}).get('name', site_choice)})" for s in selected_serials},
-            )
-
-        st.subheader("Sensor details")
-        display_cols = ["serial", "site", "type", "online", "latitude", "longitude", "added_dt", "last_seen_dt"]
-        with st.spinner("Loading sensor details..."):
-            st.dataframe(site_df[display_cols], hide_index=True, width="stretch")
-
-        with st.expander("API requests (details)", expanded=False):
-            logs = st.session_state.get("api_logs", [])
-            if not logs:
-                st.caption("No API requests yet.")
-            else:
-                log_text = "\n".join(
-                    f"{entry['url']} params={entry['params']} status={entry['status']}" for entry in logs
-                )
-                st.code(log_text)
-
-    with tab_all:
-        st.subheader("All sensors")
-        st.caption("Monitoring the configured sensor fleet with coverage, status, and message rates.")
-        st.subheader("Coverage map (all sensors)")
-        coverage_polygons: List[Dict[str, object]] = []
-        prev_log_flag = st.session_state.get("log_api", True)
-        st.session_state["log_api"] = False
-        try:
-            with st.spinner("Fetching coverage polygons for all sensors..."):
-                for serial in ALL_SERIALS:
-                    try:
-                        polygon = fetch_coverage_polygon(token, serial, all_coverage_day.strftime("%Y%m%d"), cache_bust)
-                        if polygon:
-                            coverage_polygons.append({"serial": serial, "coords": polygon})
-                    except Exception as exc:  # noqa: BLE001
-                        st.warning(f"Coverage unavailable for {serial}: {exc}")
-            render_map_with_polygons(sensors_df, coverage_polygons)
-
-            st.subheader("Message rates (all sensors)")
-            all_msg_df = pd.DataFrame()
-            with st.spinner("Loading message rates..."):
-                try:
-                    all_msg_df = fetch_msg_rates(token, ALL_SERIALS, all_rate_hours, cache_bust)
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Message rates unavailable: {exc}")
-
-            if not all_msg_df.empty:
-                all_msg_df = all_msg_df.merge(
-                    pd.DataFrame(
-                        [{"serial": s, "site": SERIAL_TO_SITE.get(s, {}).get("name", "")} for s in ALL_SERIALS]
-                    ),
-                    on="serial",
-                    how="left",
-                )
-                all_msg_df = all_msg_df.sort_values("ts")
-            render_msg_chart(
-                all_msg_df,
-                ALL_SERIALS,
-                {s: f"{s} ({SERIAL_TO_SITE.get(s, {}).get('name', '')})".strip() for s in ALL_SERIALS},
-            )
-        finally:
-            st.session_state["log_api"] = prev_log_flag
-
-        st.subheader("All sensor details")
-        display_cols = ["serial", "site", "type", "online", "latitude", "longitude", "added_dt", "last_seen_dt"]
-        with st.spinner("Loading sensor details..."):
-            st.dataframe(
-                sensors_df[display_cols].sort_values(["site", "serial"]),
-                hide_index=True,
-                use_container_width=True,
-            )
-
-    with tab_history:
-        st.subheader("Sensor status history")
-        if not ph_token:
-            st.warning("Set POCKETHOST_ADMIN_TOKEN (or pockethost_admin_token in secrets) to view history.")
+    st.session_state["cache_bust"] = cache_bust
+    try:
+        render_header()
+        # Unlike st.tabs, which runs every tab body on each run, only the selected view is computed.
+        # Its data stays in the shared caches, so switching back to a view does not fetch it again.
+        view = st.radio("View", VIEWS, horizontal=True, key="view", label_visibility="collapsed")
+        if view == "All sensors":
+            all_sensors_view()
+        elif view == "Status history":
+            status_history_view(ph_token)
+        elif view == "Coverage history":
+            coverage_history_view()
+        elif view == "Operations":
+            render_operations()
         else:
-            with st.spinner("Fetching status history..."):
-                history_df = fetch_status_history(ph_token, history_months)
-            if history_df.empty:
-                st.warning("No status history found for the selected window.")
-            else:
-                history_df["label"] = history_df.apply(
-                    lambda row: f"{row['serial']} ({row['icao']}) - {row['airport']}", axis=1
-                )
-                history_df["site_group"] = history_df.apply(
-                    lambda row: f"{row['icao']} - {row['airport']}", axis=1
-                )
-                history_df["online_val"] = history_df["online"].astype(int)
-                history_df["status_txt"] = history_df["online"].apply(lambda v: "Online" if v else "Offline")
-                history_df = history_df.sort_values(["country", "site_group", "serial", "ts"])
-                for country, country_df in history_df.groupby("country"):
-                    st.markdown(f"## {country}")
-                    site_groups = list(country_df["site_group"].unique())
-                    for idx in range(0, len(site_groups), 2):
-                        cols = st.columns(2)
-                        for offset in range(2):
-                            if idx + offset >= len(site_groups):
-                                continue
-                            site_name = site_groups[idx + offset]
-                            site_df = country_df[country_df["site_group"] == site_name]
-                            with cols[offset]:
-                                st.markdown(f"### {site_name}")
-                                line = (
-                                    alt.Chart(site_df)
-                                    .mark_line(interpolate="step-after", strokeWidth=2)
-                                    .encode(
-                                        x=alt.X("ts:T", title="Timestamp (UTC)"),
-                                        y=alt.Y(
-                                            "online_val:Q",
-                                            title="",
-                                            scale=alt.Scale(domain=[0, 1]),
-                                            axis=alt.Axis(values=[0, 1], labels=False, ticks=False),
-                                        ),
-                                        color=alt.Color(
-                                            "status_txt:N",
-                                            legend=alt.Legend(title="Status"),
-                                            scale=alt.Scale(domain=["Online", "Offline"], range=["#2a9d8f", "#e76f51"]),
-                                        ),
-                                        tooltip=[
-                                            alt.Tooltip("label:N", title="Sensor"),
-                                            alt.Tooltip("ts:T", title="Timestamp (UTC)"),
-                                            alt.Tooltip("status_txt:N", title="Status"),
-                                        ],
-                                    )
-                                    .properties(height=80)
-                                )
-                                points = line.mark_circle(size=35, strokeWidth=0)
-                                layered = alt.layer(line, points)
-                                faceted = layered.facet(
-                                    row=alt.Row(
-                                        "label:N",
-                                        title=None,
-                                        header=alt.Header(labelAngle=0, labelAlign="left"),
-                                    )
-                                )
-                                st.altair_chart(faceted.resolve_scale(y="independent"), width="stretch")
+            site_view()
+    finally:
+        # The refresh applies to this run only; the header timer and view reruns go back to the snapshots.
+        st.session_state["cache_bust"] = "stable"
 
 
 if __name__ == "__main__":
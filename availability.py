@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+HOUR = pd.Timedelta(hours=1)
+
+
+def _with_durations(segments: pd.DataFrame, start: datetime, end: datetime) -> pd.DataFrame:
+    seg = segments.copy()
+    seg["start"] = seg["start"].clip(lower=pd.Timestamp(start))
+    seg["end"] = seg["end"].clip(upper=pd.Timestamp(end))
+    seg = seg[seg["end"] > seg["start"]]
+    seg = seg.sort_values(["serial", "start"], kind="stable")
+    seg["hours"] = (seg["end"] - seg["start"]) / HOUR
+    seg["online_h"] = np.where(seg["online"], seg["hours"], 0.0)
+    seg["offline_h"] = seg["hours"] - seg["online_h"]
+    offline = ~seg["online"].astype(bool)
+    same_serial = seg["serial"].eq(seg["serial"].shift())
+    # Offline runs of a sensor separated only by a data gap are one outage; mark where each starts.
+    seg["outage"] = offline & ~(same_serial & offline.shift(fill_value=False))
+    seg["outage_h"] = seg["offline_h"].groupby(seg["outage"].cumsum()).transform("sum").where(seg["outage"])
+    # A failure is an offline run that directly follows an online run of the same sensor.
+    contiguous = same_serial & seg["start"].eq(seg["end"].shift())
+    seg["failure"] = seg["outage"] & contiguous & seg["online"].shift(fill_value=False).astype(bool)
+    # Unknown time before a run: from the window start, or from the end of the sensor's previous run.
+    prev_end = seg["end"].shift().where(same_serial, pd.Timestamp(start))
+    seg["gap_h"] = ((seg["start"] - prev_end) / HOUR).clip(lower=0)
+    seg["gap"] = seg["gap_h"] > 0
+    return seg
+
+
+def availability_stats(segments: pd.DataFrame, start: datetime, end: datetime) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Fleet availability KPIs from status segments (see status_history.status_segments).
+
+    Returns (per_sensor, per_site) tables with uptime %, outage count, longest outage, MTBF/MTTR
+    (hours) and data gaps, i.e. stretches with no valid status record, such as missed polls.
+    Uptime is measured over the time with a known state only. Offline runs separated only by a
+    data gap count as one outage of their combined offline hours.
+    """
+    if segments.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    seg = _with_durations(segments, start, end)
+    window_h = (pd.Timestamp(end) - pd.Timestamp(start)) / HOUR
+
+    sensors = seg.groupby("serial", sort=True).agg(
+        icao=("icao", "last"),
+        airport=("airport", "last"),
+        country=("country", "last"),
+        known_h=("hours", "sum"),
+        online_h=("online_h", "sum"),
+        offline_h=("offline_h", "sum"),
+        outages=("outage", "sum"),
+        failures=("failure", "sum"),
+        longest_outage_h=("outage_h", "max"),
+        data_gaps=("gap", "sum"),
+        gap_h=("gap_h", "sum"),
+        last_end=("end", "max"),
+    )
+    trailing_gap_h = ((pd.Timestamp(end) - sensors.pop("last_end")) / HOUR).clip(lower=0)
+    sensors["data_gaps"] += (trailing_gap_h > 0).astype(int)
+    sensors["gap_h"] += trailing_gap_h
+    sensors["site"] = sensors["icao"] + " - " + sensors["airport"]
+    sensors = _add_rates(sensors)
+    sensors["coverage_pct"] = 100 * sensors["known_h"] / window_h
+
+    sites = sensors.groupby(["country", "site"], sort=True).agg(
+        sensors=("icao", "size"),
+        known_h=("known_h", "sum"),
+        online_h=("online_h", "sum"),
+        offline_h=("offline_h", "sum"),
+        outages=("outages", "sum"),
+        failures=("failures", "sum"),
+        longest_outage_h=("longest_outage_h", "max"),
+        data_gaps=("data_gaps", "sum"),
+        gap_h=("gap_h", "sum"),
+    )
+    sites = _add_rates(sites)
+    return sensors.reset_index(), sites.reset_index()
+
+
+def _add_rates(df: pd.DataFrame) -> pd.DataFrame:
+    known = df["known_h"].where(df["known_h"] > 0)
+    failures = df["failures"].where(df["failures"] > 0)
+    outages = df["outages"].where(df["outages"] > 0)
+    df["uptime_pct"] = 100 * df["online_h"] / known
+    df["mtbf_h"] = df["online_h"] / failures
+    df["mttr_h"] = df["offline_h"] / outages
+    df["longest_outage_h"] = df["longest_outage_h"].fillna(0.0)
+    return df
@@ -0,0 +1,121 @@
+"""Compare the row-wise and vectorized /sensor/list enrichment on a synthetic fleet."""
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+# Ensure repository root is on the import path when running as a script
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app import enrich_sensor_list  # noqa: E402
+from sensor_metadata import normalize_serial  # noqa: E402
+
+
+def legacy_enrich_sensor_list(
+    df: pd.DataFrame, serial_filter: List[int], serial_to_site: Dict[int, Dict[str, object]]
+) -> pd.DataFrame:
+    """The previous row-wise fetch_sensor_list body, kept as the benchmark baseline."""
+    if df.empty or not serial_filter:
+        return df
+    df = df.copy()
+    df["serial"] = df["serial"].apply(normalize_serial)
+    df = df[df["serial"].notna()].copy()
+    df["serial"] = df["serial"].astype(int)
+    df = df[df["serial"].isin(serial_filter)].copy()
+    df["site"] = df["serial"].apply(lambda s: serial_to_site.get(s, {}).get("name", ""))
+    df["icao"] = df["serial"].apply(lambda s: serial_to_site.get(s, {}).get("icao", ""))
+    df["airport"] = df["serial"].apply(lambda s: serial_to_site.get(s, {}).get("airport", ""))
+    df["country"] = df["serial"].apply(lambda s: serial_to_site.get(s, {}).get("country", ""))
+    df["latitude"] = df.apply(lambda row: serial_to_site.get(row["serial"], {}).get("lat"), axis=1)
+    df["longitude"] = df.apply(lambda row: serial_to_site.get(row["serial"], {}).get("lon"), axis=1)
+    df["latitude"] = df.apply(
+        lambda row: row["latitude"]
+        if pd.notnull(row["latitude"])
+        else (row["position"].get("latitude") if isinstance(row.get("position"), dict) else None),
+        axis=1,
+    )
+    df["longitude"] = df.apply(
+        lambda row: row["longitude"]
+        if pd.notnull(row["longitude"])
+        else (row["position"].get("longitude") if isinstance(row.get("position"), dict) else None),
+        axis=1,
+    )
+    df["added_dt"] = pd.to_datetime(df["added"], unit="s", utc=True, errors="coerce")
+    df["last_seen_dt"] = pd.to_datetime(df["lastConnectionEvent"], unit="s", utc=True, errors="coerce")
+    return df
+
+
+def synthetic_fleet(sensors: int, seed: int = 7):
+    """
+    Build a /sensor/list payload and matching serial_to_site mapping.
+
+    A tenth of sites lack coordinates; some serials are padded or written as floats ("1000025.0",
+    "1000.026e3"), which are not valid serials and must be dropped.
+    """
+    rng = random.Random(seed)
+    payload = []
+    serial_to_site: Dict[int, Dict[str, object]] = {}
+    for i in range(sensors):
+        serial = 1_000_000 + i
+        lat, lon = rng.uniform(35, 70), rng.uniform(-10, 40)
+        raw_serial = str(serial)
+        if i % 50 == 24:
+            raw_serial = f" {serial} "
+        elif i % 50 == 25:
+            raw_serial = f"{serial}.0"
+        elif i % 50 == 26:
+            raw_serial = f" {serial / 1000}e3"
+        payload.append(
+            {
+                "serial": raw_serial,
+                "type": "Radarcape",
+                "online": rng.random() > 0.1,
+                "added": 1_600_000_000 + i,
+                "lastConnectionEvent": 1_700_000_000 + i,
+                "position": {"latitude": lat, "longitude": lon},
+            }
+        )
+        serial_to_site[serial] = {
+            "name": f"S{i // 3:04d} (Site {i // 3})",
+            "icao": f"S{i // 3:04d}",
+            "airport": f"Site {i // 3}",
+            "country": "Country",
+            "lat": None if i % 10 == 0 else lat,
+            "lon": None if i % 10 == 0 else lon,
+        }
+    return payload, serial_to_site
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sensors", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload, serial_to_site = synthetic_fleet(args.sensors)
+    serials = sorted(serial_to_site)
+    raw = pd.DataFrame(payload)
+
+    new = enrich_sensor_list(raw, serials, serial_to_site)
+    old = legacy_enrich_sensor_list(raw, serials, serial_to_site)
+    columns = ["serial", "site", "icao", "airport", "country", "latitude", "longitude"]
+    pd.testing.assert_frame_equal(
+        new[columns].reset_index(drop=True), old[columns].reset_index(drop=True), check_dtype=False
+    )
+
+    legacy = min(timeit.repeat(lambda: legacy_enrich_sensor_list(raw, serials, serial_to_site), number=1, repeat=args.repeat))
+    vectorized = min(timeit.repeat(lambda: enrich_sensor_list(raw, serials, serial_to_site), number=1, repeat=args.repeat))
+    print(f"sensors={args.sensors}")
+    print(f"row-wise   {legacy * 1000:8.1f} ms")
+    print(f"vectorized {vectorized * 1000:8.1f} ms")
+    print(f"speed-up   {legacy / vectorized:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Local HTTP stand-ins for the OpenSky API, its OAuth endpoint, PocketBase and the Teams webhook."""
+import json
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+COUNTRIES = [("Lithuania", "LTU"), ("Georgia", "GEO"), ("Sweden", "SWE"), ("Latvia", "LVA")]
+SENSORS_PER_SITE = 3
+POLYGON_POINTS = 360
+
+_CONDITION = re.compile(r'polling_time\s*(>=|>|<=|<)\s*"([^"]+)"')
+
+
+def _pb_time(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+def _parse_pb_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+class Fleet:
+    """
+    A deterministic synthetic sensor fleet.
+
+    Sensors are grouped three to a site, sites cycle through a few countries (Georgia included,
+    for scripts/fetch_georgia_sensors.py), and every sensor has one status record per poll for
+    the last `months` * 30 days. Records are computed from their position in the time-ordered
+    collection, so even 10k sensors over 12 months never have to exist in memory at once.
+    """
+
+    def __init__(
+        self,
+        sensors: int = 100,
+        months: int = 3,
+        poll_hours: float = 1.0,
+        msg_step_s: int = 60,
+        now: Optional[datetime] = None,
+    ):
+        self.sensors = sensors
+        self.serials = [1_000_000 + i for i in range(sensors)]
+        self.poll = timedelta(hours=poll_hours)
+        self.msg_step_s = msg_step_s
+        self.now = (now or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+        self.slots = int(timedelta(days=months * 30) / self.poll) + 1
+        self.start = self.now - self.poll * (self.slots - 1)
+        self.details = [self._details(i) for i in range(sensors)]
+
+    def _site(self, index: int) -> Tuple[str, str, str, str, float, float]:
+        site = index // SENSORS_PER_SITE
+        country, iso3 = COUNTRIES[site % len(COUNTRIES)]
+        lat = 35.0 + (site * 7.3) % 35
+        lon = -10.0 + (site * 11.7) % 50
+        return f"S{site:04d}", f"Site {site}", country, iso3, lat, lon
+
+    def _details(self, index: int) -> Dict:
+        icao, airport, country, iso3, lat, lon = self._site(index)
+        return {
+            "id": f"d{index:09d}",
+            "airport_icao": icao,
+            "airport_name": airport,
+            "country_name": country,
+            "country_iso3": iso3,
+            "latitude": lat,
+            "longitude": lon,
+            "sensor_serial": self.serials[index],
+        }
+
+    def online(self, index: int, slot: int) -> bool:
+        # Each sensor has a recurring outage of a few polls, offset per sensor.
+        return (slot // 6 + index) % 29 != 0
+
+    def sensor_list(self) -> List[Dict]:
+        now_ts = int(time.time())
+        return [
+            {
+                "serial": serial,
+                "type": "Radarcape",
+                "online": self.online(i, self.slots - 1),
+                "added": 1_600_000_000 + i,
+                "lastConnectionEvent": now_ts - (i % 600),
+                "position": {"latitude": self._site(i)[4], "longitude": self._site(i)[5]},
+            }
+            for i, serial in enumerate(self.serials)
+        ]
+
+    def status_record(self, slot: int, index: int) -> Dict:
+        icao, airport, country, iso3, _lat, _lon = self._site(index)
+        return {
+            "id": f"{slot:07d}{index:06d}",
+            "sensor_serial": self.serials[index],
+            "sensor_site_airport_icao": icao,
+            "sensor_site_airport_name": airport,
+            "sensor_site_country_name": country,
+            "sensor_site_country_iso3": iso3,
+            "polling_time": _pb_time(self.start + self.poll * slot),
+            "sensor_online": self.online(index, slot),
+        }
+
+    def slot_range(self, filter_expr: str) -> Tuple[int, int]:
+        """The half-open range of poll slots matching the polling_time conditions of a filter."""
+        low, high = 0, self.slots
+        for op, value in _CONDITION.findall(filter_expr or ""):
+            offset = (_parse_pb_time(value) - self.start) / self.poll
+            if op == ">=":
+                low = max(low, math.ceil(offset))
+            elif op == ">":
+                low = max(low, math.floor(offset) + 1)
+            elif op == "<":
+                high = min(high, math.ceil(offset))
+            else:
+                high = min(high, math.floor(offset) + 1)
+        return max(0, low), max(0, min(self.slots, high))
+
+    def status_page(self, filter_expr: str, sort: str, page: int, per_page: int) -> Tuple[List[Dict], int]:
+        low, high = self.slot_range(filter_expr)
+        total = max(0, high - low) * self.sensors
+        first = (page - 1) * per_page
+        items = []
+        descending = sort.startswith("-")
+        for position in range(first, min(total, first + per_page)):
+            slot, index = divmod(position, self.sensors)
+            if descending:
+                slot, index = high - 1 - slot, self.sensors - 1 - index
+            else:
+                slot += low
+            items.append(self.status_record(slot, index))
+        return items, total
+
+    def msg_rates(self, serials: List[str], begin: int, end: int) -> Dict:
+        stamps = range(begin - begin % self.msg_step_s, end, self.msg_step_s)
+        series = {}
+        for serial in serials:
+            phase = int(serial) % 97
+            series[serial] = [[t * 1000, float(200 + 150 * math.sin((t / 3600 + phase) / 3.8))] for t in stamps]
+        return {"series": series}
+
+    def range_days(self, serials: List[str], days: List[str]) -> Dict:
+        payload: Dict[str, List[Dict]] = {}
+        for day in days:
+            entries = []
+            for serial in serials:
+                try:
+                    index = int(serial) - 1_000_000
+                except ValueError:
+                    continue
+                if not 0 <= index < self.sensors:
+                    continue
+                _icao, _airport, _country, _iso3, lat, lon = self._site(index)
+                wobble = 1 + 0.1 * math.sin(int(day) % 31 + index)
+                entries.append(
+                    {
+                        "serial": int(serial),
+                        "ranges": [
+                            [
+                                300.0,
+                                lat + 2.5 * wobble * math.sin(math.radians(a)) * (1 + 0.2 * math.sin(math.radians(5 * a))),
+                                lon + 4.0 * wobble * math.cos(math.radians(a)) * (1 + 0.2 * math.sin(math.radians(5 * a))),
+                            ]
+                            for a in range(POLYGON_POINTS)
+                        ],
+                    }
+                )
+            payload[day] = entries
+        return payload
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        return
+
+    def _send(self, status: int, payload: object) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = urlsplit(self.path).path
+        self.server.count(path)
+        if path == "/auth/token":
+            self._send(200, {"access_token": "benchmark-token", "expires_in": 1800})
+        elif path == "/api/batch":
+            requests = json.loads(body or b"{}").get("requests", [])
+            self._send(200, [{"status": 200, "body": {}} for _ in requests])
+        else:
+            self._send(200, {})
+
+    def do_GET(self) -> None:  # noqa: N802
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = {name: values[0] for name, values in parse_qs(parts.query).items()}
+        self.server.count(path)
+        fleet = self.server.fleet
+        if path == "/api/sensor/list":
+            self._send(200, fleet.sensor_list())
+        elif path == "/api/stats/msg-rates":
+            end = int(float(query.get("end", time.time())))
+            begin = int(float(query.get("begin", end - 24 * 3600)))
+            self._send(200, fleet.msg_rates(query.get("serials", "").split(","), begin, end))
+        elif path == "/api/range/days":
+            self._send(200, fleet.range_days(query.get("serials", "").split(","), query.get("days", "").split(",")))
+        elif path.startswith("/api/collections/") and path.endswith("/records"):
+            page = int(query.get("page", 1))
+            per_page = int(query.get("perPage", 30))
+            if "opensky_sensor_details" in path:
+                total = len(fleet.details)
+                items = fleet.details[(page - 1) * per_page : page * per_page]
+            else:
+                items, total = fleet.status_page(query.get("filter", ""), query.get("sort", ""), page, per_page)
+                if query.get("fields"):
+                    fields = query["fields"].split(",")
+                    items = [{name: item[name] for name in fields if name in item} for item in items]
+            skip_total = query.get("skipTotal") in ("1", "true")
+            self._send(
+                200,
+                {
+                    "page": page,
+                    "perPage": per_page,
+                    "totalItems": -1 if skip_total else total,
+                    "totalPages": -1 if skip_total else max(1, math.ceil(total / per_page)),
+                    "items": items,
+                },
+            )
+        else:
+            self._send(404, {"message": "Not found"})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fleet: Fleet):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.fleet = fleet
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+
+
+class FakeUpstream:
+    """
+    All upstream services on one local port, serving a Fleet.
+
+    Point the code at it with OPENSKY_API_URL=<url>/api, OPENSKY_AUTH_URL=<url>/auth/token,
+    POCKETHOST_BASE=<url> and TEAMS_WEBHOOK_URL=<url>/webhook (see env()).
+    """
+
+    def __init__(self, fleet: Fleet):
+        self.fleet = fleet
+        self._server = _Server(fleet)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-upstream", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "FakeUpstream":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def env(self) -> Dict[str, str]:
+        return {
+            "OPENSKY_API_URL": f"{self.url}/api",
+            "OPENSKY_AUTH_URL": f"{self.url}/auth/token",
+            "POCKETHOST_BASE": self.url,
+            "TEAMS_WEBHOOK_URL": f"{self.url}/webhook",
+            "OPENSKY_CLIENT_ID": "benchmark",
+            "OPENSKY_CLIENT_SECRET": "benchmark",
+            "POCKETHOST_ADMIN_TOKEN": "benchmark",
+        }
+
+    def counts(self) -> Dict[str, int]:
+        """Requests received per path since start."""
+        with self._server._lock:
+            return dict(self._server.counts)
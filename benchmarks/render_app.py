@@ -0,0 +1,22 @@
+"""Streamlit entry point for the benchmark: runs app.main() and stores the render time of the selected view in session state."""
+import sys
+import time
+from pathlib import Path
+
+import streamlit as st
+
+# Ensure repository root is on the import path when running as a script
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import app  # noqa: E402
+
+TIMINGS_KEY = "benchmark_timings"
+
+started = time.perf_counter()
+try:
+    app.main()
+finally:
+    # Only the selected view renders, so the run's time is that view's time (plus the page header).
+    st.session_state[TIMINGS_KEY] = {st.session_state.get("view") or app.VIEWS[0]: time.perf_counter() - started}
@@ -0,0 +1,372 @@
+"""
+Time the dashboard's loaders, page render, background prefetch and scripts against local stand-in servers.
+
+Everything runs offline: benchmarks/fake_upstream.py serves a synthetic fleet in place of
+OpenSky, its OAuth endpoint, PocketBase and the Teams webhook, and all caches live in a
+temporary directory. Results go to a JSON report; pass --compare with an earlier report to
+see the change per benchmark.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Ensure repository root is on the import path when running as a script
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+for path in (ROOT_DIR, BENCH_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import streamlit.config  # noqa: E402
+
+from fake_upstream import FakeUpstream, Fleet  # noqa: E402
+
+SCRIPTS = ["poll_sensor_status.py", "alert_offline_sensors.py", "fetch_georgia_sensors.py"]
+MSG_RATE_HOURS = 24
+# Background refresh interval for the prefetch benchmark: long enough that no job reruns mid-measurement.
+PREFETCH_BENCH_INTERVAL = "3600"
+# Warnings Streamlit logs for every call made outside a script run, by logger.
+BARE_MODE_WARNINGS = {
+    "streamlit.runtime.scriptrunner_utils.script_run_context": "missing ScriptRunContext",
+    "streamlit.runtime.caching.cache_data_api": "No runtime found",
+    "streamlit.runtime.state.session_state_proxy": "Session state does not function",
+}
+
+
+def summarize(runs: List[float]) -> Dict[str, object]:
+    if not runs:
+        return {"runs": []}
+    return {
+        "min_s": min(runs),
+        "median_s": statistics.median(runs),
+        "mean_s": statistics.fmean(runs),
+        "max_s": max(runs),
+        "runs": runs,
+    }
+
+
+def request_delta(after: Dict[str, int], before: Dict[str, int]) -> Dict[str, int]:
+    return {path: count - before.get(path, 0) for path, count in sorted(after.items()) if count - before.get(path, 0)}
+
+
+class _ThreadMessageFilter(logging.Filter):
+    def __init__(self, thread_id: int, message: str):
+        super().__init__()
+        self.thread_id = thread_id
+        self.message = message
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.thread != self.thread_id or self.message not in record.getMessage()
+
+
+@contextmanager
+def bare_mode() -> Iterator[None]:
+    """
+    Drop Streamlit's bare-mode warnings for calls this thread makes outside a script run.
+
+    Only the calling thread is filtered: worker threads started by app code, and the script
+    threads of AppTest renders, still report a missing script context.
+    """
+    filters = [
+        (logging.getLogger(name), _ThreadMessageFilter(threading.get_ident(), message))
+        for name, message in BARE_MODE_WARNINGS.items()
+    ]
+    for logger, message_filter in filters:
+        logger.addFilter(message_filter)
+    try:
+        yield
+    finally:
+        for logger, message_filter in filters:
+            logger.removeFilter(message_filter)
+
+
+class Suite:
+    """Runs benchmarks against one FakeUpstream and collects their results."""
+
+    def __init__(self, upstream: FakeUpstream, workdir: Path, repeat: int):
+        self.upstream = upstream
+        self.workdir = workdir
+        self.repeat = repeat
+        self.results: Dict[str, Dict[str, object]] = {}
+
+    def record(self, name: str, runs: List[float], requests: Optional[Dict[str, int]], error: Optional[str] = None) -> None:
+        result = {**summarize(runs), "upstream_requests": requests or {}}
+        if error:
+            result["error"] = error
+        self.results[name] = result
+        timing = f"{result['median_s'] * 1000:10.1f} ms" if runs else "    failed   "
+        print(f"{name:<45} {timing}  {error or ''}".rstrip(), flush=True)
+
+    def measure(self, name: str, func: Callable[[], object], setup: Optional[Callable[[], None]] = None) -> None:
+        """Time `func` `repeat` times (after `setup` each time); upstream requests are those of the first run."""
+        runs: List[float] = []
+        requests: Optional[Dict[str, int]] = None
+        error = None
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            before = self.upstream.counts()
+            started = time.perf_counter()
+            try:
+                func()
+            except BaseException as exc:  # noqa: BLE001
+                error = f"{type(exc).__name__}: {exc}"
+                break
+            runs.append(time.perf_counter() - started)
+            if requests is None:
+                requests = request_delta(self.upstream.counts(), before)
+        self.record(name, runs, requests, error)
+
+    def clear_memory(self) -> None:
+        """Drop every in-process cache, as a server restart would; the disk tier survives."""
+        import streamlit as st
+
+        import disk_cache
+
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        disk_cache._default_cache = None
+
+    def clear_all(self) -> None:
+        """Drop the in-process caches and everything on disk (disk cache, status store, coverage archive)."""
+        self.clear_memory()
+        shutil.rmtree(self.workdir / "cache", ignore_errors=True)
+        (self.workdir / "cache").mkdir()
+
+    def loaders(self, months: int) -> None:
+        import app
+
+        env = self.upstream.env()
+        ph_token = env["POCKETHOST_ADMIN_TOKEN"]
+        token = app.get_manager(env["OPENSKY_CLIENT_ID"], env["OPENSKY_CLIENT_SECRET"]).token()
+        self.clear_all()
+        _df, serials, serial_to_site, _sites = app.load_sensor_metadata(ph_token, "stable")
+
+        loaders: Dict[str, Callable[[], object]] = {
+            "load_sensor_metadata": lambda: app.load_sensor_metadata(ph_token, "stable"),
+            "fetch_sensor_list": lambda: app.fetch_sensor_list(token, serials, serial_to_site, "stable"),
+            "fetch_msg_rates": lambda: app.fetch_msg_rates(token, serials, MSG_RATE_HOURS, "stable"),
+            "fetch_status_history": lambda: app.fetch_status_history(ph_token, months),
+        }
+        for name, func in loaders.items():
+            # cold: nothing cached; disk: a restarted process with the shared disk tier; warm: in-process caches.
+            self.measure(f"{name}.cold", func, setup=self.clear_all)
+            self.measure(f"{name}.disk", func, setup=self.clear_memory)
+            self.measure(f"{name}.warm", func)
+
+    def render(self, timeout: float) -> None:
+        """Render the page with AppTest once per view, cold and then warm, as a session opening only that view."""
+        from streamlit.testing.v1 import AppTest
+
+        import app
+        from render_app import TIMINGS_KEY
+
+        runs: Dict[str, List[float]] = {}
+        requests: Dict[str, Dict[str, int]] = {}
+        errors: Dict[str, str] = {}
+        for _ in range(self.repeat):
+            for view in app.VIEWS:
+                self.clear_all()
+                at = AppTest.from_file(str(BENCH_DIR / "render_app.py"), default_timeout=timeout)
+                at.session_state["view"] = view
+                for phase in ("cold", "warm"):
+                    name = f"render.{phase}.{view}"
+                    before = self.upstream.counts()
+                    at.run()
+                    if at.exception:
+                        errors[name] = at.exception[0].message
+                        continue
+                    runs.setdefault(name, []).append(at.session_state[TIMINGS_KEY][view])
+                    requests.setdefault(name, request_delta(self.upstream.counts(), before))
+        for name, values in runs.items():
+            self.record(name, values, requests.get(name))
+        for name, message in errors.items():
+            self.record(name, [], None, message)
+
+    @contextmanager
+    def _prefetch_enabled(self) -> Iterator[None]:
+        """Turn the prefetcher on for app; the other phases run with PREFETCH_ENABLED=0 so pages load directly."""
+        import app
+
+        app.PREFETCH_ENABLED = True
+        try:
+            yield
+        finally:
+            app.PREFETCH_ENABLED = False
+
+    def _warm_prefetcher(self, timeout: float) -> None:
+        """Register every background job and wait until each has a snapshot."""
+        import app
+
+        deadline = time.monotonic() + timeout
+        while True:
+            missing = [name for name in app.PREFETCH_JOBS if app.warm_snapshot(name, False) is None]
+            if not missing:
+                return
+            errors = {name: (app._prefetcher().get(name) or app.Snapshot(None, 0.0)).error for name in missing}
+            failed = {name: error for name, error in errors.items() if error}
+            if failed:
+                raise RuntimeError(f"prefetch failed: {failed}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"no snapshot within {timeout:.0f} s for {', '.join(missing)}")
+            time.sleep(0.1)
+
+    def prefetch(self, timeout: float) -> None:
+        """
+        Time each background job cold, then render every view as a new session on a server whose
+        prefetcher is warm: Streamlit's data caches are empty, the snapshots are not.
+        """
+        import streamlit as st
+        from streamlit.testing.v1 import AppTest
+
+        import app
+        from render_app import TIMINGS_KEY
+
+        for name, (job, _interval) in app.PREFETCH_JOBS.items():
+            self.measure(f"prefetch.job.{name}", job, setup=self.clear_all)
+
+        self.clear_all()
+        with self._prefetch_enabled():
+            try:
+                self._warm_prefetcher(timeout)
+            except Exception as exc:  # noqa: BLE001
+                self.record("render.prefetched", [], None, f"{type(exc).__name__}: {exc}")
+                return
+            for view in app.VIEWS:
+
+                def render(view: str = view) -> None:
+                    at = AppTest.from_file(str(BENCH_DIR / "render_app.py"), default_timeout=timeout)
+                    at.session_state["view"] = view
+                    at.run()
+                    if at.exception:
+                        raise RuntimeError(at.exception[0].message)
+                    if TIMINGS_KEY not in at.session_state:
+                        raise RuntimeError("render_app stored no timing")
+
+                self.measure(f"render.prefetched.{view}", render, setup=st.cache_data.clear)
+
+    def scripts(self) -> None:
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT_DIR), os.environ.get("PYTHONPATH")]))}
+        for script in SCRIPTS:
+
+            def run(script: str = script) -> None:
+                proc = subprocess.run(
+                    [sys.executable, str(ROOT_DIR / "scripts" / script)],
+                    cwd=self.workdir,
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                )
+                if proc.returncode != 0:
+                    lines = (proc.stderr or proc.stdout).strip().splitlines()
+                    raise RuntimeError(lines[-1] if lines else f"exit status {proc.returncode}")
+
+            self.measure(f"script.{Path(script).stem}", run, setup=self.clear_all)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict, baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('commit') or 'unknown commit'}):")
+    for name, result in report["results"].items():
+        before = baseline["results"].get(name, {}).get("median_s")
+        after = result.get("median_s")
+        if before is None or after is None:
+            continue
+        print(f"{name:<45} {before * 1000:10.1f} ms -> {after * 1000:10.1f} ms  ({after / before:5.2f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sensors", type=int, default=100, help="fleet size (100 to 10000)")
+    parser.add_argument("--months", type=int, default=3, help="status history served and loaded (1 to 12)")
+    parser.add_argument("--poll-hours", type=float, default=1.0, help="interval between synthetic status records")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds allowed per page render")
+    phases = ["loaders", "render", "prefetch", "scripts"]
+    parser.add_argument("--only", nargs="+", choices=phases, default=phases)
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument("--compare", help="an earlier report to compare medians with")
+    args = parser.parse_args()
+
+    fleet = Fleet(sensors=args.sensors, months=args.months, poll_hours=args.poll_hours)
+    upstream = FakeUpstream(fleet).start()
+    workdir = Path(tempfile.mkdtemp(prefix="opensky-bench-"))
+    (workdir / "cache").mkdir()
+    # Module settings are read at import time, so the environment is complete before app is imported.
+    os.environ.update(upstream.env())
+    os.environ.update(
+        {
+            "DISK_CACHE_PATH": str(workdir / "cache" / "disk_cache.sqlite"),
+            "STATUS_STORE_PATH": str(workdir / "cache" / "status_history.sqlite"),
+            "COVERAGE_ARCHIVE_DIR": str(workdir / "cache" / "coverage"),
+            "PREFETCH_ENABLED": "0",
+            "PREFETCH_FLEET_INTERVAL": PREFETCH_BENCH_INTERVAL,
+            "PREFETCH_MSG_RATE_INTERVAL": PREFETCH_BENCH_INTERVAL,
+            "PREFETCH_COVERAGE_INTERVAL": PREFETCH_BENCH_INTERVAL,
+            "PREFETCH_HISTORY_INTERVAL": PREFETCH_BENCH_INTERVAL,
+            "METRICS_PORT": "0",
+        }
+    )
+    # Streamlit's one-time "run it with streamlit run" notice for element calls outside a script run.
+    streamlit.config.set_option("global.showWarningOnDirectExecution", False)
+    suite = Suite(upstream, workdir, args.repeat)
+    try:
+        # The suite calls loaders and jobs directly, outside any script run.
+        with bare_mode():
+            if "loaders" in args.only:
+                suite.loaders(args.months)
+            if "render" in args.only:
+                suite.render(args.timeout)
+            if "prefetch" in args.only:
+                suite.prefetch(args.timeout)
+            if "scripts" in args.only:
+                suite.scripts()
+    finally:
+        upstream.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sensors": args.sensors,
+            "months": args.months,
+            "poll_hours": args.poll_hours,
+            "repeat": args.repeat,
+        },
+        "results": suite.results,
+    }
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
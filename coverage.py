@@ -0,0 +1,290 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from disk_cache import DiskCache
+from geometry import as_polygon, empty_polygon, max_distances_km, ring_areas_km2
+from sensor_metadata import normalize_serial
+
+logger = logging.getLogger(__name__)
+
+CoverageKey = Tuple[int, str]
+# (n, 2) float32 array of [lon, lat] vertices.
+Polygon = np.ndarray
+PayloadFetcher = Callable[[List[int], List[str]], Dict]
+
+COVERAGE_SERIAL_BATCH = int(os.getenv("COVERAGE_SERIAL_BATCH", "25"))
+COVERAGE_DAY_BATCH = int(os.getenv("COVERAGE_DAY_BATCH", "7"))
+COVERAGE_ARCHIVE_DIR = os.getenv("COVERAGE_ARCHIVE_DIR", os.path.join(".cache", "coverage"))
+# Hours after midnight UTC before a day's coverage is treated as final and archived.
+COVERAGE_ARCHIVE_SETTLE_HOURS = int(os.getenv("COVERAGE_ARCHIVE_SETTLE_HOURS", "6"))
+COVERAGE_BASELINE_DAYS = int(os.getenv("COVERAGE_BASELINE_DAYS", "7"))
+COVERAGE_DEGRADATION_PCT = float(os.getenv("COVERAGE_DEGRADATION_PCT", "20"))
+
+
+def range_days_params(serials: Sequence[int], days: Sequence[str]) -> Dict[str, str]:
+    return {"days": ",".join(days), "serials": ",".join(map(str, serials))}
+
+
+def parse_range_days(payload: Dict, serials: Sequence[int], days: Sequence[str]) -> Dict[CoverageKey, Polygon]:
+    """
+    Split a multi-serial, multi-day /range/days payload into per-(serial, day) polygons.
+
+    Only pairs the payload reports are returned: an entry without ranges is an empty polygon
+    ("no coverage"), while a serial or day left out of the reply has no entry at all, so callers
+    can tell an omission from reported empty coverage.
+    """
+    polygons: Dict[CoverageKey, Polygon] = {}
+    if not isinstance(payload, dict):
+        return polygons
+    unattributed = 0
+    for day, day_data in payload.items():
+        if not isinstance(day_data, list):
+            continue
+        for entry in day_data:
+            if not isinstance(entry, dict):
+                continue
+            serial = normalize_serial(entry.get("serial"))
+            if serial is None and len(serials) == 1:
+                serial = serials[0]
+            if serial is None:
+                unattributed += 1
+                continue
+            ranges = np.asarray(entry.get("ranges") or [], dtype=np.float32)
+            if not ranges.size:
+                polygons[(serial, str(day))] = empty_polygon()
+                continue
+            if ranges.ndim != 2 or ranges.shape[1] < 3:
+                continue
+            # API returns [distance, lat, lon]
+            polygons[(serial, str(day))] = as_polygon(ranges[:, [2, 1]])
+    if unattributed:
+        logger.warning("Dropped %d /range/days entries without a serial in a reply for %d serials", unattributed, len(serials))
+    return polygons
+
+
+class CoverageCache:
+    """
+    Thread-safe per-(serial, day) coverage polygon cache with a fixed TTL.
+
+    With a DiskCache, misses fall through to the shared disk tier and writes go to both, so
+    other workers and restarts reuse polygons fetched in the last `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = 600.0, disk: Optional[DiskCache] = None):
+        self.ttl = ttl
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._entries: Dict[CoverageKey, Tuple[float, Polygon]] = {}
+
+    def get(self, key: CoverageKey, newer_than: float = 0.0) -> Optional[Polygon]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            fetched_at, polygon = entry
+            if fetched_at >= newer_than and time.time() - fetched_at <= self.ttl:
+                return polygon
+        if self.disk is None:
+            return None
+        return self.disk.get("coverage", _disk_key(key), newer_than=newer_than)
+
+    def put_many(self, polygons: Dict[CoverageKey, Polygon]) -> None:
+        now = time.time()
+        with self._lock:
+            for key, polygon in polygons.items():
+                self._entries[key] = (now, polygon)
+            expired = [key for key, (fetched_at, _) in self._entries.items() if now - fetched_at > self.ttl]
+            for key in expired:
+                del self._entries[key]
+        if self.disk is not None:
+            self.disk.set_many("coverage", {_disk_key(key): polygon for key, polygon in polygons.items()}, self.ttl)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _disk_key(key: CoverageKey) -> str:
+    return f"{key[0]}:{key[1]}"
+
+
+class CoverageArchive:
+    """
+    Permanent on-disk store of coverage polygons for finished days.
+
+    A day's coverage no longer changes once it is over (plus a settling period), so each
+    (serial, day) polygon is written once as <root>/<day>/<serial>.npy and served from disk from
+    then on. Files are written to a temporary name and renamed into place, so concurrent readers
+    and processes never see a partial file. Writes are best effort: when the disk is full or
+    read-only, polygons are simply not archived and are fetched again later.
+    """
+
+    def __init__(self, root: str = COVERAGE_ARCHIVE_DIR, settle: timedelta = timedelta(hours=COVERAGE_ARCHIVE_SETTLE_HOURS)):
+        self.root = root
+        self.settle = settle
+
+    def is_final(self, day: str, now: Optional[datetime] = None) -> bool:
+        try:
+            day_end = datetime.strptime(day, "%Y%m%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+        except ValueError:
+            return False
+        return day_end + self.settle <= (now or datetime.now(timezone.utc))
+
+    def _path(self, key: CoverageKey) -> str:
+        serial, day = key
+        return os.path.join(self.root, day, f"{serial}.npy")
+
+    def get(self, key: CoverageKey) -> Optional[Polygon]:
+        try:
+            return as_polygon(np.load(self._path(key), allow_pickle=False))
+        except (OSError, ValueError):
+            return None
+
+    def put_many(self, polygons: Dict[CoverageKey, Polygon]) -> None:
+        now = datetime.now(timezone.utc)
+        try:
+            for key, polygon in polygons.items():
+                if self.is_final(key[1], now):
+                    self._write(self._path(key), polygon)
+        except OSError as exc:
+            # The rest of the batch would fail the same way; the caller still has its polygons.
+            logger.warning("Coverage archive write to %s failed: %s", self.root, exc)
+
+    def _write(self, path: str, polygon: Polygon) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                np.save(handle, polygon, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def _chunks(values: Sequence, size: int) -> List[List]:
+    size = max(1, size)
+    return [list(values[i : i + size]) for i in range(0, len(values), size)]
+
+
+def load_coverage(
+    fetch_payload: PayloadFetcher,
+    cache: CoverageCache,
+    serials: Sequence[int],
+    days: Sequence[str],
+    newer_than: float = 0.0,
+    max_workers: int = 8,
+    serial_batch: int = COVERAGE_SERIAL_BATCH,
+    day_batch: int = COVERAGE_DAY_BATCH,
+    archive: Optional[CoverageArchive] = None,
+) -> Iterator[Tuple[List[CoverageKey], Dict[CoverageKey, Polygon], Optional[Exception]]]:
+    """
+    Load coverage polygons for every (serial, day) pair, batching cache misses into multi-serial requests.
+
+    Yields (requested_keys, polygons, error) per batch as batches complete; cache hits are yielded first.
+    Days missing the same serials share batches, so no batch asks again for a cached pair.
+    Finished days are read from the archive, if given, regardless of `newer_than`. Successful
+    batches are written to the cache (and finished days to the archive) before they are yielded.
+    Pairs the reply leaves out count as no coverage (an empty polygon) in the cache until it
+    expires, so they are not requested on every render, but are never archived.
+    """
+    hits: Dict[CoverageKey, Polygon] = {}
+    missing: Dict[str, List[int]] = {}
+    unique_serials = list(dict.fromkeys(serials))
+    for day in dict.fromkeys(days):
+        final = archive is not None and archive.is_final(day)
+        for serial in unique_serials:
+            polygon = archive.get((serial, day)) if final else None
+            if polygon is None:
+                polygon = cache.get((serial, day), newer_than)
+            if polygon is None:
+                missing.setdefault(day, []).append(serial)
+            else:
+                hits[(serial, day)] = polygon
+    if hits:
+        yield list(hits), hits, None
+    if not missing:
+        return
+
+    days_by_serials: Dict[Tuple[int, ...], List[str]] = {}
+    for day, day_serials in missing.items():
+        days_by_serials.setdefault(tuple(day_serials), []).append(day)
+    batches = [
+        (serial_chunk, day_chunk)
+        for group_serials, group_days in days_by_serials.items()
+        for day_chunk in _chunks(group_days, day_batch)
+        for serial_chunk in _chunks(group_serials, serial_batch)
+    ]
+
+    def _load(serial_chunk: List[int], day_chunk: List[str]) -> Dict[CoverageKey, Polygon]:
+        reported = parse_range_days(fetch_payload(serial_chunk, day_chunk), serial_chunk, day_chunk)
+        if archive is not None:
+            archive.put_many(reported)
+        polygons = {
+            (serial, day): reported.get((serial, day), empty_polygon()) for serial in serial_chunk for day in day_chunk
+        }
+        cache.put_many(polygons)
+        return polygons
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+        futures = {pool.submit(_load, *batch): batch for batch in batches}
+        for future in as_completed(futures):
+            serial_chunk, day_chunk = futures[future]
+            keys = [(serial, day) for serial in serial_chunk for day in day_chunk]
+            try:
+                polygons = future.result()
+            except Exception as exc:  # noqa: BLE001
+                yield keys, {}, exc
+                continue
+            yield keys, polygons, None
+
+
+def coverage_trend(polygons: Dict[CoverageKey, Polygon], positions: Dict[int, Tuple[float, float]]) -> pd.DataFrame:
+    """
+    Per (serial, day) coverage statistics from polygons and each sensor's (lat, lon) position.
+
+    Columns: serial, day, area_km2, max_range_km, their day-over-day change in %, the median area
+    of the previous COVERAGE_BASELINE_DAYS days, and `degraded` when a day's area falls more than
+    COVERAGE_DEGRADATION_PCT below that baseline. Days without coverage have NaN statistics, so
+    an offline sensor is not reported as degraded.
+    """
+    columns = [
+        "serial", "day", "area_km2", "max_range_km", "area_change_pct", "range_change_pct", "baseline_area_km2", "degraded",
+    ]
+    if not polygons:
+        return pd.DataFrame(columns=columns)
+    keys = sorted(polygons)
+    rings = [polygons[key] for key in keys]
+    serials = np.array([serial for serial, _ in keys], dtype=np.int64)
+    lats = [positions.get(serial, (np.nan, np.nan))[0] for serial, _ in keys]
+    lons = [positions.get(serial, (np.nan, np.nan))[1] for serial, _ in keys]
+    df = pd.DataFrame(
+        {
+            "serial": serials,
+            "day": pd.to_datetime([day for _, day in keys], format="%Y%m%d", utc=True),
+            "area_km2": ring_areas_km2(rings),
+            "max_range_km": max_distances_km(rings, lats, lons),
+        }
+    )
+    by_serial = df.groupby("serial", sort=False)
+    df["area_change_pct"] = 100 * by_serial["area_km2"].pct_change(fill_method=None)
+    df["range_change_pct"] = 100 * by_serial["max_range_km"].pct_change(fill_method=None)
+    previous = by_serial["area_km2"].shift()
+    df["baseline_area_km2"] = (
+        previous.groupby(df["serial"], sort=False)
+        .rolling(COVERAGE_BASELINE_DAYS, min_periods=1)
+        .median()
+        .reset_index(level=0, drop=True)
+    )
+    df["degraded"] = df["area_km2"] < df["baseline_area_km2"] * (1 - COVERAGE_DEGRADATION_PCT / 100)
+    return df[columns]
@@ -0,0 +1,199 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+DISK_CACHE_PATH = os.getenv("DISK_CACHE_PATH", os.path.join(".cache", "disk_cache.sqlite"))
+DISK_CACHE_MAX_MB = float(os.getenv("DISK_CACHE_MAX_MB", "256"))
+# Set DISK_CACHE_ENABLED=0 to bypass the disk tier (every lookup misses, nothing is written).
+DISK_CACHE_ENABLED = os.getenv("DISK_CACHE_ENABLED", "1") != "0"
+# Reads refresh an entry's access time (for LRU eviction) at most this often, so most hits need no write lock.
+ACCESS_RESOLUTION = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+_MISSING = object()
+
+
+class DiskCache:
+    """
+    Size-bounded, TTL-aware key/value cache in one SQLite file, shared by processes on the host.
+
+    Values are pickled, so only point it at a directory the app owns. Each write is a single
+    transaction (readers never see partial values) and WAL mode lets Streamlit workers and the
+    scripts read while another process writes. When the total size exceeds `max_bytes`, the
+    least recently used entries are evicted. The tier is best effort: database errors count as
+    misses and skipped writes rather than failing the caller.
+    """
+
+    def __init__(self, path: str = DISK_CACHE_PATH, max_bytes: int = int(DISK_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, namespace: str, key: str, newer_than: float = 0.0, default: Any = None) -> Any:
+        """Return a live value written at or after `newer_than` (epoch seconds), else `default`."""
+        return self.get_many(namespace, [key], newer_than).get(key, default)
+
+    def get_many(self, namespace: str, keys: Iterable[str], newer_than: float = 0.0) -> Dict[str, Any]:
+        """Return {key: value} for the keys that have a live entry."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        try:
+            with closing(self._connect()) as conn, conn:
+                rows = conn.execute(
+                    f"SELECT key, value, accessed FROM entries WHERE namespace = ? AND key IN ({placeholders}) "
+                    "AND expires > ? AND created >= ?",
+                    (namespace, *keys, now, newer_than),
+                ).fetchall()
+                stale = [(now, namespace, key) for key, _blob, accessed in rows if accessed < now - ACCESS_RESOLUTION]
+                if stale:
+                    conn.executemany("UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?", stale)
+        except sqlite3.Error:
+            return {}
+        values: Dict[str, Any] = {}
+        for key, blob, _accessed in rows:
+            try:
+                values[key] = pickle.loads(blob)
+            except Exception:  # noqa: BLE001
+                continue
+        return values
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        self.set_many(namespace, {key: value}, ttl)
+
+    def set_many(self, namespace: str, values: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        rows = []
+        for key, value in values.items():
+            try:
+                blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:  # noqa: BLE001
+                continue
+            rows.append((namespace, key, sqlite3.Binary(blob), len(blob), now, now, now + ttl))
+        if not rows:
+            return
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._evict(conn, now)
+        except sqlite3.Error:
+            return
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for namespace, key, size in conn.execute("SELECT namespace, key, size FROM entries ORDER BY accessed"):
+            victims.append((namespace, key))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+
+    def delete(self, namespace: str, key: Optional[str] = None) -> None:
+        """Drop one entry, or the whole namespace when no key is given."""
+        try:
+            with closing(self._connect()) as conn, conn:
+                if key is None:
+                    conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+                else:
+                    conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error:
+            return
+
+
+_default_cache: Optional[DiskCache] = None
+
+
+def default_cache() -> Optional[DiskCache]:
+    """The process-wide DiskCache at DISK_CACHE_PATH, or None when the disk tier is disabled or unusable."""
+    global _default_cache
+    if not DISK_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        try:
+            _default_cache = DiskCache()
+        except (OSError, sqlite3.Error):
+            return None
+    return _default_cache
+
+
+def cache_key(values: Dict[str, Any]) -> str:
+    return hashlib.sha256(pickle.dumps(sorted(values.items()), protocol=4)).hexdigest()
+
+
+def disk_cached(
+    namespace: str, ttl: float, ignore: Sequence[str] = (), bust_arg: Optional[str] = "cache_bust"
+) -> Callable[[Callable], Callable]:
+    """
+    Cache a function's return value in the shared disk cache for `ttl` seconds.
+
+    Arguments named in `ignore` (e.g. short-lived tokens) are left out of the key. A numeric
+    `bust_arg` value, as passed by "Refresh now", only accepts entries written after that time;
+    the fresh result then replaces the shared entry.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        skipped = {*ignore, *([bust_arg] if bust_arg else [])}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = default_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = cache_key({name: value for name, value in bound.arguments.items() if name not in skipped})
+            newer_than = bust_time(bound.arguments.get(bust_arg)) if bust_arg else 0.0
+            value = cache.get(namespace, key, newer_than=newer_than, default=_MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                cache.set(namespace, key, value, ttl)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def bust_time(cache_bust: Any) -> float:
+    """Return the refresh timestamp encoded in cache_bust (0.0 for the stable key)."""
+    try:
+        return float(cache_bust)
+    except (TypeError, ValueError):
+        return 0.0
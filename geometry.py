@@ -0,0 +1,193 @@
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Simplification error allowed on screen, in pixels at the map's initial zoom.
+GEOMETRY_TOLERANCE_PX = float(os.getenv("GEOMETRY_TOLERANCE_PX", "1.0"))
+# Decimal places kept when sending coordinates to the browser (4 is ~11 m).
+GEOMETRY_DECIMALS = int(os.getenv("GEOMETRY_DECIMALS", "4"))
+GEOMETRY_CACHE_SIZE = int(os.getenv("GEOMETRY_CACHE_SIZE", "4096"))
+EARTH_RADIUS_KM = 6371.0088
+
+Bounds = Tuple[float, float, float, float]
+
+_simplified: "OrderedDict[Tuple[bytes, float], np.ndarray]" = OrderedDict()
+_simplified_lock = threading.Lock()
+
+
+def empty_polygon() -> np.ndarray:
+    return np.empty((0, 2), dtype=np.float32)
+
+
+def as_polygon(coords) -> np.ndarray:
+    """Return [lon, lat] vertices as an (n, 2) float32 array."""
+    arr = np.asarray(coords, dtype=np.float32)
+    if arr.ndim != 2 or arr.shape[1] != 2:
+        return empty_polygon()
+    return arr
+
+
+def zoom_tolerance(zoom: float, lat: float, pixels: float = GEOMETRY_TOLERANCE_PX) -> float:
+    """Distance in latitude degrees covered by `pixels` screen pixels at a web-mercator zoom level."""
+    return pixels * 360.0 / (256.0 * 2.0**zoom) * math.cos(math.radians(lat))
+
+
+def _dp_keep(points: np.ndarray, tolerance: float) -> np.ndarray:
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        inner = points[first + 1 : last]
+        start, end = points[first], points[last]
+        segment = end - start
+        length = math.hypot(segment[0], segment[1])
+        if length == 0.0:
+            dist = np.hypot(inner[:, 0] - start[0], inner[:, 1] - start[1])
+        else:
+            dist = np.abs(segment[0] * (inner[:, 1] - start[1]) - segment[1] * (inner[:, 0] - start[0])) / length
+        index = int(np.argmax(dist))
+        if dist[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def simplify_polygon(polygon: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplify a closed [lon, lat] ring with Douglas-Peucker; `tolerance` is in latitude degrees.
+
+    Longitudes are scaled by cos(latitude) so the tolerance is the same distance in every
+    direction. The ring is split at the vertex farthest from its first vertex, and both halves
+    are simplified as open polylines, so the start vertex does not bias the result.
+    """
+    if len(polygon) <= 4 or tolerance <= 0:
+        return polygon
+    points = polygon.astype(np.float64)
+    points[:, 0] *= math.cos(math.radians(float(points[:, 1].mean())))
+    far = int(np.argmax(np.hypot(points[:, 0] - points[0, 0], points[:, 1] - points[0, 1])))
+    if far == 0:
+        return polygon[:1]
+    keep = np.zeros(len(points), dtype=bool)
+    keep[: far + 1] = _dp_keep(points[: far + 1], tolerance)
+    ring = np.vstack([points[far:], points[:1]])
+    keep[far:] |= _dp_keep(ring, tolerance)[:-1]
+    return polygon[keep]
+
+
+def simplify_cached(polygon: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    simplify_polygon with an LRU memo keyed by the ring's content.
+
+    The tolerance is rounded down to a half power of two first, so small changes of the map
+    view (e.g. while coverage is still streaming in) reuse earlier results.
+    """
+    if len(polygon) <= 4 or tolerance <= 0:
+        return polygon
+    tolerance = 2.0 ** (math.floor(math.log2(tolerance) * 2) / 2)
+    key = (hashlib.blake2b(polygon.tobytes(), digest_size=16).digest(), tolerance)
+    with _simplified_lock:
+        cached = _simplified.get(key)
+        if cached is not None:
+            _simplified.move_to_end(key)
+            return cached
+    simplified = simplify_polygon(polygon, tolerance)
+    with _simplified_lock:
+        _simplified[key] = simplified
+        while len(_simplified) > GEOMETRY_CACHE_SIZE:
+            _simplified.popitem(last=False)
+    return simplified
+
+
+def bounds(polygons: Sequence[np.ndarray]) -> Optional[Bounds]:
+    """Return (min_lon, min_lat, max_lon, max_lat) over all vertices, or None if there are none."""
+    arrays = [p for p in polygons if len(p)]
+    if not arrays:
+        return None
+    points = np.concatenate(arrays)
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    return float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])
+
+
+def centroid(polygons: Sequence[np.ndarray]) -> Optional[Tuple[float, float]]:
+    """Return the mean (lon, lat) of all vertices, or None if there are none."""
+    arrays = [p for p in polygons if len(p)]
+    if not arrays:
+        return None
+    lon, lat = np.concatenate(arrays).astype(np.float64).mean(axis=0)
+    return float(lon), float(lat)
+
+
+def fit_zoom(box: Bounds, width_px: int, height_px: int, max_zoom: float) -> float:
+    """Largest web-mercator zoom (capped at max_zoom) at which the bounding box fits the viewport."""
+    min_lon, min_lat, max_lon, max_lat = box
+    mid_lat = math.radians((min_lat + max_lat) / 2)
+    lon_span = max(max_lon - min_lon, 1e-6)
+    lat_span = max(max_lat - min_lat, 1e-6) / max(math.cos(mid_lat), 1e-6)
+    zoom = math.log2(min(width_px / lon_span, height_px / lat_span) * 360.0 / 256.0)
+    return min(max_zoom, zoom)
+
+
+def encode_polygon(polygon: np.ndarray, decimals: int = GEOMETRY_DECIMALS) -> List[List[float]]:
+    """Convert vertices to rounded JSON-ready lists, so the deck payload holds short numbers."""
+    return np.round(polygon.astype(np.float64), decimals).tolist()
+
+
+def _ring_index(polygons: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Concatenate rings; return (points, start offset per ring, ring id per vertex)."""
+    lengths = np.array([len(p) for p in polygons], dtype=np.int64)
+    starts = np.r_[0, np.cumsum(lengths)[:-1]]
+    points = np.concatenate([np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polygons])
+    return points, starts, np.repeat(np.arange(len(polygons)), lengths)
+
+
+def ring_areas_km2(polygons: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Area of each [lon, lat] ring in km², with NaN for rings of fewer than 3 vertices.
+
+    Every ring is projected equirectangularly around its own mean latitude and measured with the
+    shoelace formula, all rings in one vectorized pass; the error is well below 1% for rings a
+    few hundred km across.
+    """
+    areas = np.full(len(polygons), np.nan)
+    valid = [i for i, p in enumerate(polygons) if len(p) >= 3]
+    if not valid:
+        return areas
+    points, starts, ring = _ring_index([polygons[i] for i in valid])
+    lengths = np.diff(np.r_[starts, len(points)])
+    lon, lat = np.radians(points[:, 0]), np.radians(points[:, 1])
+    lat0 = np.add.reduceat(lat, starts) / lengths
+    x = EARTH_RADIUS_KM * lon * np.cos(lat0)[ring]
+    y = EARTH_RADIUS_KM * lat
+    nxt = np.arange(1, len(points) + 1)
+    nxt[starts + lengths - 1] = starts  # close each ring on its first vertex
+    cross = x * y[nxt] - x[nxt] * y
+    areas[valid] = np.abs(np.add.reduceat(cross, starts)) / 2
+    return areas
+
+
+def max_distances_km(polygons: Sequence[np.ndarray], lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """Great-circle distance from each origin to the farthest vertex of its ring (NaN if either is missing)."""
+    distances = np.full(len(polygons), np.nan)
+    origin_lat = np.asarray(lats, dtype=np.float64)
+    origin_lon = np.asarray(lons, dtype=np.float64)
+    valid = [i for i, p in enumerate(polygons) if len(p) and np.isfinite(origin_lat[i]) and np.isfinite(origin_lon[i])]
+    if not valid:
+        return distances
+    points, starts, ring = _ring_index([polygons[i] for i in valid])
+    lat1 = np.radians(origin_lat[valid])[ring]
+    lon1 = np.radians(origin_lon[valid])[ring]
+    lat2, lon2 = np.radians(points[:, 1]), np.radians(points[:, 0])
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+    distances[valid] = np.maximum.reduceat(km, starts)
+    return distances
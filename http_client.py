@@ -0,0 +1,149 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+# A 429 whose Retry-After asks for a longer pause than this is returned instead of waited out.
+HTTP_RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "60"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+HOST_TIMEOUTS: Dict[str, float] = {
+    "auth.opensky-network.org": 20.0,
+    "opensky-network.org": 30.0,
+    "opdi.pockethost.io": 30.0,
+}
+HOST_POOL_SIZES: Dict[str, int] = {}
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def configure_host(host: str, pool_size: Optional[int] = None, timeout: Optional[float] = None) -> None:
+    """Override the connection pool size and/or timeout for one host (before its first request)."""
+    host = host.lower()
+    if pool_size is not None:
+        HOST_POOL_SIZES[host] = pool_size
+    if timeout is not None:
+        HOST_TIMEOUTS[host] = timeout
+
+
+def get_session(url: str) -> requests.Session:
+    """Return the shared keep-alive session for the host of the given URL."""
+    host = _host(url)
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            pool_size = HOST_POOL_SIZES.get(host, HTTP_POOL_SIZE)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+    return session
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given zero-based retry attempt."""
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2**attempt)))
+
+
+def retry_after(resp: requests.Response) -> Optional[float]:
+    """Seconds requested by a response's Retry-After header (delta-seconds or HTTP date), if any."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def not_sent(exc: requests.RequestException) -> bool:
+    """Whether a connection error happened before the request reached the server (DNS, refused, connect timeout)."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, ConnectTimeoutError)
+
+
+def request(
+    method: str,
+    url: str,
+    timeout: Optional[float] = None,
+    max_retries: Optional[int] = None,
+    retry_429: bool = True,
+    idempotent: Optional[bool] = None,
+    **kwargs,
+) -> requests.Response:
+    """
+    Send a request through the pooled session for the URL's host.
+
+    Idempotent methods are retried on connection errors, timeouts, 429 and 5xx responses. Others
+    (POST) only when the server cannot have acted on them: a failure to connect, or a 429/503
+    with Retry-After, so record creation is never duplicated; pass idempotent=True for a POST
+    that is safe to repeat. A 429 waits at least its Retry-After; pass retry_429=False when the
+    caller schedules its own retries. The final response is returned as-is, leaving status
+    handling to the caller.
+    """
+    method = method.upper()
+    session = get_session(url)
+    if timeout is None:
+        timeout = HOST_TIMEOUTS.get(_host(url), HTTP_TIMEOUT)
+    retries = HTTP_MAX_RETRIES if max_retries is None else max_retries
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    attempt = 0
+    while True:
+        requested: Optional[float] = None
+        try:
+            resp = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            if not (idempotent or not_sent(exc)) or attempt >= retries:
+                raise
+        else:
+            throttled = resp.status_code == 429
+            if throttled or resp.status_code == 503:
+                requested = retry_after(resp)
+            if throttled:
+                retryable = retry_429 and (idempotent or requested is not None)
+            elif resp.status_code == 503 and requested is not None:
+                retryable = True
+            else:
+                retryable = idempotent and resp.status_code in RETRY_STATUSES
+            if not retryable or attempt >= retries:
+                return resp
+            if requested is not None and requested > HTTP_RETRY_AFTER_MAX:
+                return resp
+            resp.close()
+        time.sleep(max(backoff_delay(attempt), requested or 0.0))
+        attempt += 1
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
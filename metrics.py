@@ -0,0 +1,219 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+METRICS_BUFFER_SIZE = int(os.getenv("METRICS_BUFFER_SIZE", "2048"))  # recent requests kept for percentiles
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # serve /metrics on this port when set
+QUANTILES = (0.5, 0.95, 0.99)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RequestSample(NamedTuple):
+    ts: float  # epoch seconds when the response arrived
+    endpoint: str
+    status: int  # 0 when no response was received
+    seconds: float
+    bytes: int
+
+
+class _EndpointTotals:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+
+def _number(value: float) -> str:
+    return "NaN" if value != value else f"{value:.6g}"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    Process-wide API and cache metrics with bounded memory.
+
+    Totals are cumulative counters; latency percentiles come from a ring buffer of the most
+    recent `buffer_size` requests, so a long-running server never grows its history. A request
+    counts as an error when it got no response or a status of 400 or above (429s included,
+    and also counted separately as throttled).
+    """
+
+    def __init__(self, buffer_size: int = METRICS_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._samples: Deque[RequestSample] = deque(maxlen=max(1, buffer_size))
+        self._endpoints: Dict[str, _EndpointTotals] = {}
+        self._cache: Dict[str, Dict[str, int]] = {}
+
+    def record_request(self, endpoint: str, status: int, seconds: float, nbytes: int = 0) -> None:
+        sample = RequestSample(time.time(), endpoint, status, seconds, nbytes)
+        with self._lock:
+            self._samples.append(sample)
+            totals = self._endpoints.get(endpoint)
+            if totals is None:
+                totals = self._endpoints[endpoint] = _EndpointTotals()
+            totals.requests += 1
+            totals.errors += status == 0 or status >= 400
+            totals.throttled += status == 429
+            totals.bytes += nbytes
+            totals.seconds += seconds
+
+    def _count_call(self, name: str) -> None:
+        with self._lock:
+            self._cache.setdefault(name, {"calls": 0, "misses": 0})["calls"] += 1
+
+    def _count_miss(self, name: str) -> None:
+        with self._lock:
+            self._cache.setdefault(name, {"calls": 0, "misses": 0})["misses"] += 1
+
+    def recent(self, limit: Optional[int] = None) -> List[RequestSample]:
+        """The most recent requests, newest first."""
+        with self._lock:
+            samples = list(self._samples)
+        samples.reverse()
+        return samples[:limit] if limit is not None else samples
+
+    def endpoint_summary(self) -> Dict[str, Dict[str, float]]:
+        """Per endpoint: totals since start and p50/p95/p99 latency (ms) over the ring buffer."""
+        with self._lock:
+            samples = list(self._samples)
+            totals = {name: vars(t).copy() for name, t in self._endpoints.items()}
+        latencies: Dict[str, List[float]] = {}
+        for sample in samples:
+            latencies.setdefault(sample.endpoint, []).append(sample.seconds)
+        summary: Dict[str, Dict[str, float]] = {}
+        for name, total in sorted(totals.items()):
+            values = np.asarray(latencies.get(name, []), dtype=float)
+            row: Dict[str, float] = {
+                "requests": total["requests"],
+                "errors": total["errors"],
+                "throttled": total["throttled"],
+                "bytes": total["bytes"],
+            }
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}_ms"] = float(np.quantile(values, q) * 1000) if len(values) else float("nan")
+            summary[name] = row
+        return summary
+
+    def cache_summary(self) -> Dict[str, Dict[str, float]]:
+        """Per cached function: calls, hits, misses and hit ratio since start."""
+        with self._lock:
+            counts = {name: dict(c) for name, c in self._cache.items()}
+        summary: Dict[str, Dict[str, float]] = {}
+        for name, c in sorted(counts.items()):
+            # A call still computing has counted its miss but not yet returned.
+            hits = max(0, c["calls"] - c["misses"])
+            summary[name] = {
+                "calls": c["calls"],
+                "hits": hits,
+                "misses": c["misses"],
+                "hit_ratio": hits / c["calls"] if c["calls"] else float("nan"),
+            }
+        return summary
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            samples = list(self._samples)
+            totals = {name: vars(t).copy() for name, t in self._endpoints.items()}
+            cache = {name: dict(c) for name, c in self._cache.items()}
+        latencies: Dict[str, List[float]] = {}
+        for sample in samples:
+            latencies.setdefault(sample.endpoint, []).append(sample.seconds)
+
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("opensky_api_request_duration_seconds", "summary", "OpenSky API request latency (quantiles over recent requests).")
+        for name, total in sorted(totals.items()):
+            endpoint = _label(name)
+            values = np.asarray(latencies.get(name, []), dtype=float)
+            for q in QUANTILES:
+                value = float(np.quantile(values, q)) if len(values) else float("nan")
+                lines.append(f'opensky_api_request_duration_seconds{{endpoint="{endpoint}",quantile="{q}"}} {_number(value)}')
+            lines.append(f'opensky_api_request_duration_seconds_sum{{endpoint="{endpoint}"}} {_number(total["seconds"])}')
+            lines.append(f'opensky_api_request_duration_seconds_count{{endpoint="{endpoint}"}} {total["requests"]}')
+        for metric, key, help_text in (
+            ("opensky_api_errors_total", "errors", "OpenSky API requests without a response or with status >= 400."),
+            ("opensky_api_throttled_total", "throttled", "OpenSky API responses with status 429."),
+            ("opensky_api_response_bytes_total", "bytes", "OpenSky API response body bytes."),
+        ):
+            family(metric, "counter", help_text)
+            for name, total in sorted(totals.items()):
+                lines.append(f'{metric}{{endpoint="{_label(name)}"}} {total[key]}')
+        family("dashboard_cache_requests_total", "counter", "Calls to cached loaders by result.")
+        for name, c in sorted(cache.items()):
+            function = _label(name)
+            lines.append(f'dashboard_cache_requests_total{{function="{function}",result="hit"}} {max(0, c["calls"] - c["misses"])}')
+            lines.append(f'dashboard_cache_requests_total{{function="{function}",result="miss"}} {c["misses"]}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def counted(cache: Callable[[Callable], Callable], name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Apply a caching decorator such as st.cache_data(...) and count its hits and misses.
+
+    Every call is counted on the way in and every execution of the wrapped function is a miss;
+    the difference is the hits.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            registry._count_miss(label)
+            return func(*args, **kwargs)
+
+        cached = cache(compute)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            registry._count_call(label)
+            return cached(*args, **kwargs)
+
+        wrapper.clear = getattr(cached, "clear", None)
+        return wrapper
+
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        return
+
+
+def serve(port: int = METRICS_PORT, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve GET /metrics for a Prometheus scraper on a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,235 @@
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sensor_metadata import normalize_serial
+
+MSG_RATE_COLUMNS = ["serial", "ts", "rate"]
+MSG_RATE_RETENTION_HOURS = 72
+MSG_RATE_MIN_REFRESH = 60.0  # seconds before a cached series' tail is fetched again
+
+
+def empty_msg_rates() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "serial": pd.Series(dtype=np.int32),
+            "ts": pd.Series(dtype="datetime64[ms, UTC]"),
+            "rate": pd.Series(dtype=np.float32),
+        }
+    )
+
+
+def parse_msg_rates(payload: Dict) -> pd.DataFrame:
+    """
+    Parse a /stats/msg-rates payload ({"series": {serial: [[ms, rate], ...]}}) into a compact DataFrame.
+
+    Each serial's series becomes NumPy arrays that are concatenated once, and all timestamps are
+    converted in a single call. Columns: serial (int32), ts (datetime64[ms, UTC]), rate (float32).
+    """
+    series = payload.get("series", {}) if isinstance(payload, dict) else {}
+    serials: List[np.ndarray] = []
+    stamps: List[np.ndarray] = []
+    rates: List[np.ndarray] = []
+    for sid, values in series.items():
+        serial = normalize_serial(sid)
+        if serial is None or not values:
+            continue
+        try:
+            points = np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            continue
+        if points.ndim != 2 or points.shape[1] < 2:
+            continue
+        points = points[~np.isnan(points[:, 0])]
+        serials.append(np.full(len(points), serial, dtype=np.int32))
+        stamps.append(points[:, 0].astype(np.int64))
+        rates.append(points[:, 1].astype(np.float32))
+    return _build_frame(serials, stamps, rates)
+
+
+def _build_frame(serials: List[np.ndarray], stamps: List[np.ndarray], rates: List[np.ndarray]) -> pd.DataFrame:
+    if not stamps:
+        return empty_msg_rates()
+    ts = pd.DatetimeIndex(np.concatenate(stamps).astype("datetime64[ms]")).tz_localize("UTC")
+    return pd.DataFrame({"serial": np.concatenate(serials), "ts": ts, "rate": np.concatenate(rates)})
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling of a sorted series to `threshold` points."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # threshold - 2 buckets between the fixed first and last points; every bucket holds at least one point.
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Bucket averages for every bucket (plus the last point) in one pass; bucket i uses average i + 1.
+    bounds = np.r_[edges, n]
+    counts = np.diff(bounds)
+    avg_x = np.add.reduceat(x, bounds[:-1]) / counts
+    avg_y = np.add.reduceat(y, bounds[:-1]) / counts
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y[i + 1] - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, buckets: int) -> np.ndarray:
+    """Indices of the minimum and maximum point in each of `buckets` equal-width time buckets."""
+    n = len(x)
+    if buckets * 2 >= n or buckets < 1:
+        return np.arange(n)
+    span = x[-1] - x[0]
+    bucket = np.minimum(((x - x[0]) * buckets / span).astype(np.int64), buckets - 1) if span > 0 else np.zeros(n, np.int64)
+    order = np.lexsort((y, bucket))
+    sorted_bucket = bucket[order]
+    firsts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+    lasts = np.r_[firsts[1:] - 1, n - 1]
+    return np.unique(np.concatenate([order[firsts], order[lasts], [0, n - 1]]))
+
+
+def downsample_msg_rates(df: pd.DataFrame, width_px: int, method: str = "lttb") -> pd.DataFrame:
+    """
+    Reduce each serial's series to roughly one point per horizontal pixel of the chart.
+
+    method="lttb" keeps the visual shape of the line; method="minmax" keeps every bucket's
+    extremes, so spikes and drop-outs are never lost. Rows with a missing rate are dropped.
+    """
+    if df.empty:
+        return df
+    data = df[df["rate"].notna()].sort_values(["serial", "ts"], kind="stable")
+    x_all = data["ts"].dt.tz_convert("UTC").dt.tz_localize(None).to_numpy(dtype="datetime64[ms]").astype(np.int64).astype(np.float64)
+    y_all = data["rate"].to_numpy(dtype=np.float64)
+    serials = data["serial"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, serials[1:] != serials[:-1]]) if len(serials) else np.array([], np.int64)
+    ends = np.r_[starts[1:], len(serials)]
+    keep = []
+    for start, end in zip(starts, ends):
+        x, y = x_all[start:end], y_all[start:end]
+        if method == "minmax":
+            keep.append(start + minmax_indices(x, y, max(1, width_px // 2)))
+        else:
+            keep.append(start + lttb_indices(x, y, width_px))
+    if not keep:
+        return data
+    return data.iloc[np.concatenate(keep)].reset_index(drop=True)
+
+
+class MsgRateCache:
+    """
+    Per-serial append-only message-rate series covering the last `retention_hours`.
+
+    plan() says which serials need the requested window fetched (first use, or a longer lookback
+    than cached, so older points are backfilled only when a view asks for them) and which only
+    need their tail (from the last cached timestamp); merge() folds a response in, replacing
+    overlapping points; window() answers any cached lookback up to the retention locally.
+    Callers fetch between plan() and merge() without holding a lock, so concurrent callers may
+    fetch the same points; merging them twice is harmless.
+    """
+
+    def __init__(self, retention_hours: int = MSG_RATE_RETENTION_HOURS, min_refresh: float = MSG_RATE_MIN_REFRESH):
+        self.retention_ms = retention_hours * 3600 * 1000
+        self.min_refresh = min_refresh
+        self._lock = threading.Lock()
+        # serial -> (ts in epoch ms, rate, covered_from ms, refreshed_at epoch s)
+        self._series: Dict[int, Tuple[np.ndarray, np.ndarray, int, float]] = {}
+
+    def plan(self, serials: Sequence[int], now: float, hours: int, newer_than: float = 0.0) -> Dict[int, List[int]]:
+        """Group serials that need fetching for the last `hours` by request begin (epoch seconds)."""
+        now_ms = int(now * 1000)
+        window_from = now_ms - min(hours * 3600 * 1000, self.retention_ms)
+        full: List[int] = []
+        tail: List[int] = []
+        tail_begin = now_ms // 1000
+        with self._lock:
+            for serial in serials:
+                entry = self._series.get(serial)
+                if entry is None or entry[2] > window_from + self.min_refresh * 1000:
+                    full.append(serial)
+                    continue
+                ts, _rate, covered_from, refreshed_at = entry
+                if refreshed_at >= newer_than and now - refreshed_at < self.min_refresh:
+                    continue
+                tail.append(serial)
+                last_ms = int(ts[-1]) if len(ts) else covered_from
+                tail_begin = min(tail_begin, last_ms // 1000)
+        plan: Dict[int, List[int]] = {}
+        if full:
+            plan[window_from // 1000] = full
+        if tail:
+            plan.setdefault(tail_begin, []).extend(tail)
+        return plan
+
+    def merge(self, serials: Sequence[int], frame: pd.DataFrame, begin: int, now: float) -> None:
+        """Fold a response for `serials` fetched from `begin` (epoch seconds) into the cache."""
+        now_ms = int(now * 1000)
+        cutoff = now_ms - self.retention_ms
+        frame = frame.sort_values(["serial", "ts"], kind="stable")
+        ts_all = frame["ts"].to_numpy(dtype="datetime64[ms]").astype(np.int64)
+        rate_all = frame["rate"].to_numpy(dtype=np.float32)
+        serial_all = frame["serial"].to_numpy()
+        with self._lock:
+            for serial in serials:
+                lo, hi = np.searchsorted(serial_all, [serial, serial + 1])
+                new_ts, new_rate = ts_all[lo:hi], rate_all[lo:hi]
+                entry = self._series.get(serial)
+                covered_from = begin * 1000
+                refreshed_at = now
+                if entry is not None:
+                    old_ts, old_rate, old_covered, old_refreshed = entry
+                    covered_from = min(covered_from, old_covered)
+                    # A slower concurrent fetch may merge after a newer one.
+                    refreshed_at = max(now, old_refreshed)
+                    new_ts = np.concatenate([old_ts, new_ts])
+                    new_rate = np.concatenate([old_rate, new_rate])
+                    order = np.argsort(new_ts, kind="stable")
+                    new_ts, new_rate = new_ts[order], new_rate[order]
+                    # Stable sort keeps fetched points after cached ones, so keep the last of each timestamp.
+                    last = np.r_[new_ts[1:] != new_ts[:-1], True] if len(new_ts) else np.array([], bool)
+                    new_ts, new_rate = new_ts[last], new_rate[last]
+                keep = new_ts >= cutoff
+                self._series[serial] = (new_ts[keep], new_rate[keep], max(covered_from, cutoff), refreshed_at)
+
+    def window(self, serials: Sequence[int], hours: int, now: float) -> pd.DataFrame:
+        """Return cached points from the last `hours` for the given serials."""
+        start_ms = int(now * 1000) - hours * 3600 * 1000
+        serial_parts: List[np.ndarray] = []
+        stamps: List[np.ndarray] = []
+        rates: List[np.ndarray] = []
+        with self._lock:
+            for serial in serials:
+                entry = self._series.get(serial)
+                if entry is None:
+                    continue
+                ts, rate = entry[0], entry[1]
+                lo = np.searchsorted(ts, start_ms)
+                if lo >= len(ts):
+                    continue
+                serial_parts.append(np.full(len(ts) - lo, serial, dtype=np.int32))
+                stamps.append(ts[lo:])
+                rates.append(rate[lo:])
+        return _build_frame(serial_parts, stamps, rates)
+
+    def export(self, serials: Sequence[int]) -> Dict[int, Tuple[np.ndarray, np.ndarray, int, float]]:
+        """Return the cached entries of the given serials, e.g. to persist them."""
+        with self._lock:
+            return {serial: self._series[serial] for serial in serials if serial in self._series}
+
+    def restore(self, entries: Dict[int, Tuple[np.ndarray, np.ndarray, int, float]]) -> None:
+        """Adopt exported entries for serials that are not cached yet."""
+        with self._lock:
+            for serial, entry in entries.items():
+                self._series.setdefault(serial, entry)
+
+    def missing(self, serials: Sequence[int]) -> List[int]:
+        with self._lock:
+            return [serial for serial in serials if serial not in self._series]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") != "0"
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot(NamedTuple):
+    value: Any
+    refreshed_at: float  # epoch seconds of the last successful refresh
+    error: Optional[str] = None  # message of the last failed refresh, cleared by the next success
+
+
+class _Job:
+    def __init__(self, func: Callable[[], Any], interval: float):
+        self.func = func
+        self.interval = interval
+        self.due = 0.0
+        self.running = False
+        self.rerun = False  # triggered while running
+
+
+class Prefetcher:
+    """
+    Refreshes registered jobs on a daemon thread and keeps each job's latest result as a snapshot.
+
+    Every job runs when its interval has elapsed (or when triggered), on a small worker pool so
+    one slow job does not hold up the others. A finished refresh replaces the job's snapshot in
+    one assignment, so readers always see a complete result; failures keep the previous value
+    and record the error.
+    """
+
+    def __init__(self, max_workers: int = PREFETCH_WORKERS, tick: float = 1.0):
+        self.tick = tick
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, _Job] = {}
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, func: Callable[[], Any], interval: float) -> None:
+        """Add a job (a no-op if one with that name exists); it first runs on the next tick."""
+        with self._lock:
+            if name not in self._jobs:
+                self._jobs[name] = _Job(func, interval)
+        self._wake.set()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="prefetcher", daemon=True)
+        self._thread.start()
+
+    def get(self, name: str) -> Optional[Snapshot]:
+        with self._lock:
+            return self._snapshots.get(name)
+
+    def trigger(self, name: Optional[str] = None) -> None:
+        """Make one job (or every job) due immediately."""
+        with self._lock:
+            for job_name, job in self._jobs.items():
+                if name is None or job_name == name:
+                    job.due = 0.0
+                    job.rerun = job.running
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while True:
+            now = time.time()
+            with self._lock:
+                due = [(name, job) for name, job in self._jobs.items() if not job.running and job.due <= now]
+                for _name, job in due:
+                    job.running = True
+            for name, job in due:
+                self._pool.submit(self._run, name, job)
+            self._wake.wait(self.tick)
+            self._wake.clear()
+
+    def _run(self, name: str, job: _Job) -> None:
+        try:
+            value = job.func()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Prefetch job %s failed: %s", name, exc)
+            with self._lock:
+                previous = self._snapshots.get(name)
+                self._snapshots[name] = Snapshot(
+                    previous.value if previous else None, previous.refreshed_at if previous else 0.0, str(exc)
+                )
+        else:
+            snapshot = Snapshot(value, time.time())
+            with self._lock:
+                self._snapshots[name] = snapshot
+        finally:
+            with self._lock:
+                job.running = False
+                job.due = 0.0 if job.rerun else time.time() + job.interval
+                job.rerun = False
@@ -0,0 +1,208 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+import http_client
+
+# Request priorities; lower values are served first.
+INTERACTIVE = 0  # the site view a user is looking at
+BULK = 1  # fleet-wide views (all sensors)
+BACKFILL = 2  # background prefetch and multi-day history
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk", BACKFILL: "backfill"}
+
+OPENSKY_RATE = float(os.getenv("OPENSKY_RATE", "4"))  # requests per second per endpoint
+OPENSKY_BURST = int(os.getenv("OPENSKY_BURST", "8"))
+
+
+def _parse_limits(spec: str) -> Dict[str, Tuple[float, int]]:
+    """Parse "path=rate:burst,..." (e.g. "/range/days=2:4") into {path: (rate, burst)}."""
+    limits: Dict[str, Tuple[float, int]] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        path, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        try:
+            limits[path.strip()] = (float(rate), int(burst or max(1, round(float(rate)))))
+        except ValueError:
+            continue
+    return limits
+
+
+# Per-endpoint overrides of OPENSKY_RATE/OPENSKY_BURST.
+ENDPOINT_LIMITS: Dict[str, Tuple[float, int]] = _parse_limits(os.getenv("OPENSKY_RATE_LIMITS", ""))
+
+_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Send the requests made inside the block (on this thread) with the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class RateLimited(RuntimeError):
+    """The API kept answering 429 Too Many Requests."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def drain(self, now: float) -> None:
+        self._refill(now)
+        self.tokens = 0.0
+
+
+class _Endpoint:
+    def __init__(self, rate: float, burst: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.queue: List[Tuple[int, int]] = []  # heap of (priority, ticket)
+        self.blocked_until = 0.0  # monotonic time before which nothing is sent (Retry-After)
+        self.served = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.throttled = 0
+
+
+class RequestScheduler:
+    """
+    Client-side rate limiting with priorities, one token bucket per endpoint.
+
+    acquire() blocks until the caller may send: requests to an endpoint leave its queue in
+    priority order (FIFO within a priority) as the bucket refills. After a 429, penalize() holds
+    the whole endpoint back for the Retry-After period instead of letting callers retry at once.
+    """
+
+    def __init__(self, rate: float = OPENSKY_RATE, burst: int = OPENSKY_BURST, limits: Optional[Dict[str, Tuple[float, int]]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.limits = dict(ENDPOINT_LIMITS if limits is None else limits)
+        self._cond = threading.Condition()
+        self._tickets = itertools.count()
+        self._endpoints: Dict[str, _Endpoint] = {}
+
+    def _endpoint(self, name: str) -> _Endpoint:
+        endpoint = self._endpoints.get(name)
+        if endpoint is None:
+            rate, burst = self.limits.get(name, (self.rate, self.burst))
+            endpoint = self._endpoints[name] = _Endpoint(rate, burst)
+        return endpoint
+
+    def acquire(self, name: str, priority: int = INTERACTIVE) -> float:
+        """Wait for a send slot on an endpoint; return the seconds spent waiting."""
+        started = time.monotonic()
+        with self._cond:
+            endpoint = self._endpoint(name)
+            entry = (priority, next(self._tickets))
+            heapq.heappush(endpoint.queue, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if endpoint.queue[0] == entry:
+                        delay = endpoint.blocked_until - now
+                        if delay <= 0:
+                            delay = endpoint.bucket.take(now)
+                            if delay <= 0:
+                                break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            finally:
+                endpoint.queue.remove(entry)
+                heapq.heapify(endpoint.queue)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            endpoint.served += 1
+            endpoint.wait_total += waited
+            endpoint.wait_max = max(endpoint.wait_max, waited)
+        return waited
+
+    def penalize(self, name: str, seconds: float) -> None:
+        """Hold an endpoint back for `seconds` (e.g. from Retry-After) and empty its bucket."""
+        with self._cond:
+            endpoint = self._endpoint(name)
+            now = time.monotonic()
+            endpoint.blocked_until = max(endpoint.blocked_until, now + seconds)
+            endpoint.bucket.drain(now)
+            endpoint.throttled += 1
+            self._cond.notify_all()
+
+    def send(
+        self, name: str, func: Callable[[], requests.Response], priority: Optional[int] = None, retries: int = http_client.HTTP_MAX_RETRIES
+    ) -> requests.Response:
+        """
+        Send a request through an endpoint's queue, at the current priority unless one is given.
+
+        `func` must not retry 429s itself. A 429 pauses the endpoint for its Retry-After (or a
+        backoff delay) and the request queues again; RateLimited is raised once `retries` are
+        used up or the server asks for a pause longer than HTTP_RETRY_AFTER_MAX.
+        """
+        priority = current_priority() if priority is None else priority
+        attempt = 0
+        while True:
+            self.acquire(name, priority)
+            resp = func()
+            if resp.status_code != 429:
+                return resp
+            requested = http_client.retry_after(resp)
+            resp.close()
+            if attempt >= retries or (requested is not None and requested > http_client.HTTP_RETRY_AFTER_MAX):
+                self.penalize(name, requested if requested is not None else http_client.backoff_delay(attempt))
+                wait = f"; retry after {requested:.0f} s" if requested is not None else ""
+                raise RateLimited(f"Rate limited on {name} (HTTP 429){wait}", retry_after=requested)
+            self.penalize(name, max(http_client.backoff_delay(attempt), requested or 0.0))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per endpoint: queued requests by priority, requests served, mean/max wait (s), 429s, block left (s)."""
+        with self._cond:
+            now = time.monotonic()
+            result: Dict[str, Dict[str, float]] = {}
+            for name, endpoint in self._endpoints.items():
+                queued = {f"queued_{label}": 0 for label in PRIORITY_NAMES.values()}
+                for priority, _ticket in endpoint.queue:
+                    queued[f"queued_{PRIORITY_NAMES[priority]}"] += 1
+                result[name] = {
+                    **queued,
+                    "served": endpoint.served,
+                    "wait_mean_s": endpoint.wait_total / endpoint.served if endpoint.served else 0.0,
+                    "wait_max_s": endpoint.wait_max,
+                    "throttled": endpoint.throttled,
+                    "blocked_s": max(0.0, endpoint.blocked_until - now),
+                }
+            return result
@@ -1,41 +1,30 @@
 import os
 import sys
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
 from typing import Dict, List
 
-import requests
+# Ensure repository root is on the import path when running as a script
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
 
-POCKETHOST_BASE = "https://opdi.pockethost.io"
-POCKETHOST_COLLECTION = "opensky_sensor_status"
+import http_client
+from sensor_metadata import build_sensor_mappings, cached_sensor_details
+from status_history import iso_to_dt, max_record_gap, scan_latest_status
 
 
-def iso_to_dt(value: str) -> datetime:
-    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
-
-
-def fetch_latest_status(token: str) -> Dict[int, Dict]:
-    """Return latest record per sensor_serial, newest first overall."""
-    url = f"{POCKETHOST_BASE}/api/collections/{POCKETHOST_COLLECTION}/records"
-    params = {"sort": "-polling_time", "perPage": 500}
-    headers = {"Authorization": token, "User-Agent": "opensky-sensor-alert"}
-    resp = requests.get(url, headers=headers, params=params, timeout=30)
-    resp.raise_for_status()
-    items = resp.json().get("items", [])
-    latest: Dict[int, Dict] = {}
-    for item in items:
-        serial = item.get("sensor_serial")
-        if serial is None:
-            continue
-        if serial in latest:
-            continue  # already have newest for this serial
-        latest[serial] = item
-    return latest
+def fetch_latest_status(token: str, serials: List[int], now: datetime) -> Dict[int, Dict]:
+    """Return the latest record per sensor_serial that can still be current within the last 24h."""
+    return scan_latest_status(token, serials, now - timedelta(hours=24) - max_record_gap())
 
 
 def collect_offline(latest: Dict[int, Dict], now: datetime) -> List[Dict]:
     """Return sensors whose latest status is offline within the last 24h."""
     offline: List[Dict] = []
     threshold_24 = now - timedelta(hours=24)
+    # A record's state holds until it expires, which matters for change-only (transition) records.
+    valid_for = max_record_gap()
     for serial, item in latest.items():
         online = bool(item.get("sensor_online", False))
         ts_raw = item.get("polling_time")
@@ -44,18 +33,17 @@ def collect_offline(latest: Dict[int, Dict], now: datetime) -> List[Dict]:
         ts = iso_to_dt(ts_raw)
         if online:
             continue
-        if ts < threshold_24 or ts > now:
+        if ts + valid_for < threshold_24 or ts > now:
             continue
-        if ts <= now:
-            offline.append(
-                {
-                    "serial": serial,
-                    "icao": item.get("sensor_site_airport_icao", ""),
-                    "airport": item.get("sensor_site_airport_name", ""),
-                    "country": item.get("sensor_site_country_name", ""),
-                    "ts": ts,
-                }
-            )
+        offline.append(
+            {
+                "serial": serial,
+                "icao": item.get("sensor_site_airport_icao", ""),
+                "airport": item.get("sensor_site_airport_name", ""),
+                "country": item.get("sensor_site_country_name", ""),
+                "ts": ts,
+            }
+        )
     return offline
 
 
@@ -102,7 +90,7 @@ def send_teams(webhook_url: str, title: str, lines: List[str]) -> None:
             }
         ],
     }
-    resp = requests.post(webhook_url, json=payload, timeout=15)
+    resp = http_client.post(webhook_url, json=payload, timeout=15)
     if not resp.ok:
         raise RuntimeError(f"Teams webhook failed ({resp.status_code}): {resp.text}")
 
@@ -115,8 +103,13 @@ def main() -> None:
     if not teams_webhook:
         sys.exit("TEAMS_WEBHOOK_URL is required.")
 
+    try:
+        all_serials, _, _ = build_sensor_mappings(cached_sensor_details(token))
+    except Exception as exc:  # noqa: BLE001
+        sys.exit(f"Failed to fetch sensor metadata: {exc}")
+
     now = datetime.now(timezone.utc)
-    latest = fetch_latest_status(token)
+    latest = fetch_latest_status(token, all_serials, now)
     offline = collect_offline(latest, now)
     lines = build_message_lines(offline)
     if not lines:
@@ -2,32 +2,14 @@ import os
 import sys
 from datetime import datetime, timezone
 
-import requests
+from sensor_metadata import cached_sensor_details, normalize_serial
+from token_manager import TokenManager, get_manager
 
-from sensor_metadata import fetch_sensor_details, normalize_serial
+SENSOR_URL = os.getenv("OPENSKY_API_URL", "https://opensky-network.org/api") + "/sensor/list"
 
-AUTH_URL = "https://auth.opensky-network.org/auth/realms/opensky-network/protocol/openid-connect/token"
-SENSOR_URL = "https://opensky-network.org/api/sensor/list"
 
-
-def get_token(client_id: str, client_secret: str) -> str:
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": client_id,
-        "client_secret": client_secret,
-    }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    resp = requests.post(AUTH_URL, data=data, headers=headers, timeout=20)
-    resp.raise_for_status()
-    token = resp.json().get("access_token")
-    if not token:
-        raise RuntimeError("Token response missing access_token")
-    return token
-
-
-def fetch_sensors(token: str):
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = requests.get(SENSOR_URL, headers=headers, timeout=30)
+def fetch_sensors(tokens: TokenManager):
+    resp = tokens.request("GET", SENSOR_URL)
     resp.raise_for_status()
     return resp.json()
 
@@ -37,7 +19,7 @@ def format_ts(ts: int) -> str:
 
 
 def fetch_georgia_serials(pb_token: str):
-    details = fetch_sensor_details(pb_token)
+    details = cached_sensor_details(pb_token)
     serials = []
     for record in details:
         serial = normalize_serial(record.get("sensor_serial"))
@@ -68,8 +50,7 @@ def main():
         sys.exit("No Georgia sensors found in PocketBase metadata.")
 
     try:
-        token = get_token(client_id, client_secret)
-        sensors = fetch_sensors(token)
+        sensors = fetch_sensors(get_manager(client_id, client_secret))
     except Exception as exc:  # noqa: BLE001
         sys.exit(f"Failed to fetch sensor list: {exc}")
 
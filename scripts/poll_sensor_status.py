@@ -1,8 +1,10 @@
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
 
 import requests
 
@@ -11,32 +13,34 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from sensor_metadata import POCKETHOST_BASE, build_sensor_mappings, fetch_sensor_details, normalize_serial
+import http_client
+from sensor_metadata import POCKETHOST_BASE, build_sensor_mappings, cached_sensor_details, normalize_serial
+from status_history import HEARTBEAT, STATUS_MODE, max_record_gap, needs_status_record, scan_latest_status
+from token_manager import TokenManager, get_manager
 
-AUTH_URL = "https://auth.opensky-network.org/auth/realms/opensky-network/protocol/openid-connect/token"
-BASE_API_URL = "https://opensky-network.org/api"
+BASE_API_URL = os.getenv("OPENSKY_API_URL", "https://opensky-network.org/api")
 POCKETHOST_COLLECTION = "opensky_sensor_status"
+POCKETHOST_BATCH_SIZE = int(os.getenv("POCKETHOST_BATCH_SIZE", "50"))
+POCKETHOST_MAX_WORKERS = int(os.getenv("POCKETHOST_MAX_WORKERS", "8"))
+POCKETHOST_WRITE_ATTEMPTS = int(os.getenv("POCKETHOST_WRITE_ATTEMPTS", "3"))
 
 
-def get_opensky_token(client_id: str, client_secret: str) -> str:
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": client_id,
-        "client_secret": client_secret,
-    }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    resp = requests.post(AUTH_URL, data=data, headers=headers, timeout=30)
-    resp.raise_for_status()
-    token = resp.json().get("access_token")
-    if not token:
-        raise RuntimeError("Token response did not include access_token")
-    return token
+class BatchUnsupported(RuntimeError):
+    """Raised when the PocketBase batch endpoint is disabled or missing."""
+
+
+def _maybe_written(exc: Exception) -> bool:
+    """Whether a failed write may still have been stored (the connection dropped after the request went out)."""
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout)) and not http_client.not_sent(exc)
 
 
-def fetch_sensor_list(token: str) -> Dict[int, Dict]:
+def _unknown_outcome(exc: Exception) -> str:
+    return f"not resent, may have been written (connection lost after sending): {exc}"
+
+
+def fetch_sensor_list(tokens: TokenManager) -> Dict[int, Dict]:
     url = f"{BASE_API_URL}/sensor/list"
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = requests.get(url, headers=headers, timeout=30)
+    resp = tokens.request("GET", url)
     resp.raise_for_status()
     sensors = {}
     for item in resp.json():
@@ -47,18 +51,139 @@ def fetch_sensor_list(token: str) -> Dict[int, Dict]:
     return sensors
 
 
-def post_pockethost_status(token: str, payload: Dict) -> None:
-    url = f"{POCKETHOST_BASE}/api/collections/{POCKETHOST_COLLECTION}/records"
-    headers = {
+def _pockethost_headers(token: str) -> Dict[str, str]:
+    return {
         "Content-Type": "application/json",
         "Authorization": token,
         "User-Agent": "opensky-sensor-status",
     }
-    resp = requests.post(url, headers=headers, json=payload, timeout=20)
+
+
+def post_pockethost_status(token: str, payload: Dict) -> None:
+    url = f"{POCKETHOST_BASE}/api/collections/{POCKETHOST_COLLECTION}/records"
+    resp = http_client.post(url, headers=_pockethost_headers(token), json=payload)
     if not resp.ok:
         raise RuntimeError(f"PocketHost create failed ({resp.status_code}): {resp.text}")
 
 
+def post_pockethost_batch(token: str, payloads: List[Dict]) -> Dict[int, str]:
+    """
+    Create records in one PocketBase batch request.
+
+    Batches are transactional: on success every record is written and an empty dict is returned.
+    On a validation failure nothing is written and the positions of the rejected records are
+    returned with their error, so the caller can resend the rest.
+    """
+    url = f"{POCKETHOST_BASE}/api/batch"
+    body = {
+        "requests": [
+            {"method": "POST", "url": f"/api/collections/{POCKETHOST_COLLECTION}/records", "body": payload}
+            for payload in payloads
+        ]
+    }
+    resp = http_client.post(url, headers=_pockethost_headers(token), json=body)
+    if resp.status_code in (403, 404):
+        raise BatchUnsupported(f"PocketHost batch API unavailable ({resp.status_code}): {resp.text}")
+    if resp.ok:
+        return {}
+    try:
+        errors = resp.json().get("data", {}).get("requests", {})
+    except ValueError:
+        errors = {}
+    rejected = {int(pos): str(err) for pos, err in errors.items() if str(pos).isdigit()}
+    if resp.status_code == 400 and rejected:
+        return rejected
+    raise RuntimeError(f"PocketHost batch failed ({resp.status_code}): {resp.text}")
+
+
+def _write_batched(
+    token: str, payloads: List[Dict], pending: List[int], batch_size: int, max_workers: int
+) -> Tuple[Dict[int, str], Dict[int, str], bool]:
+    """Send pending records through the batch API; return (retryable failures, rejected, batch_supported)."""
+    chunks = [pending[i : i + max(1, batch_size)] for i in range(0, len(pending), max(1, batch_size))]
+    failed: Dict[int, str] = {}
+    rejected: Dict[int, str] = {}
+    supported = True
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        futures = {pool.submit(post_pockethost_batch, token, [payloads[i] for i in chunk]): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                chunk_rejected = future.result()
+            except BatchUnsupported as exc:
+                supported = False
+                failed.update({i: str(exc) for i in chunk})
+                continue
+            except Exception as exc:  # noqa: BLE001
+                if _maybe_written(exc):
+                    rejected.update({i: _unknown_outcome(exc) for i in chunk})
+                else:
+                    failed.update({i: str(exc) for i in chunk})
+                continue
+            for pos, error in chunk_rejected.items():
+                if pos < len(chunk):
+                    rejected[chunk[pos]] = error
+            if chunk_rejected:
+                failed.update({i: "not written: batch rolled back" for i in chunk if i not in rejected})
+    return failed, rejected, supported
+
+
+def _write_concurrent(
+    token: str, payloads: List[Dict], pending: List[int], max_workers: int
+) -> Tuple[Dict[int, str], Dict[int, str]]:
+    """POST pending records one by one through a bounded worker pool; return (retryable failures, unknown outcomes)."""
+    failed: Dict[int, str] = {}
+    unknown: Dict[int, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(post_pockethost_status, token, payloads[i]): i for i in pending}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as exc:  # noqa: BLE001
+                if _maybe_written(exc):
+                    unknown[futures[future]] = _unknown_outcome(exc)
+                else:
+                    failed[futures[future]] = str(exc)
+    return failed, unknown
+
+
+def write_status_records(
+    token: str,
+    payloads: List[Dict],
+    batch_size: int = POCKETHOST_BATCH_SIZE,
+    max_workers: int = POCKETHOST_MAX_WORKERS,
+    attempts: int = POCKETHOST_WRITE_ATTEMPTS,
+) -> List[Tuple[Dict, str]]:
+    """
+    Write status records in bulk and return (payload, error) for every record that was not written.
+
+    Records go through the PocketBase batch endpoint, falling back to concurrent single-record
+    POSTs when batching is disabled. Each further attempt resends only the records that failed;
+    records rejected by validation, and those whose connection dropped after they were sent
+    (they may have been stored), are reported without being retried.
+    """
+    pending = list(range(len(payloads)))
+    failed: Dict[int, str] = {}
+    rejected: Dict[int, str] = {}
+    use_batch = True
+    attempt = 0
+    while pending and attempt < attempts:
+        if use_batch:
+            failed, batch_rejected, use_batch = _write_batched(token, payloads, pending, batch_size, max_workers)
+            rejected.update(batch_rejected)
+            if not use_batch:
+                # Batching is off on this server; resend right away without spending an attempt.
+                pending = sorted(failed)
+                continue
+        else:
+            failed, unknown = _write_concurrent(token, payloads, pending, max_workers)
+            rejected.update(unknown)
+        pending = sorted(failed)
+        attempt += 1
+    errors = {**failed, **rejected}
+    return [(payloads[i], errors[i]) for i in sorted(errors)]
+
+
 def iso_now() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
 
@@ -74,7 +199,7 @@ def main() -> None:
         sys.exit("Set POCKETHOST_ADMIN_TOKEN.")
 
     try:
-        details = fetch_sensor_details(pb_token)
+        details = cached_sensor_details(pb_token)
         all_serials, serial_to_site, _ = build_sensor_mappings(details)
     except Exception as exc:  # noqa: BLE001
         sys.exit(f"Failed to fetch sensor metadata: {exc}")
@@ -82,13 +207,25 @@ def main() -> None:
     if not all_serials:
         sys.exit("No sensor metadata found in PocketBase.")
 
-    token = get_opensky_token(client_id, client_secret)
-    sensors = fetch_sensor_list(token)
+    sensors = fetch_sensor_list(get_manager(client_id, client_secret))
+    now = datetime.now(timezone.utc)
     now_ts = iso_now()
 
+    last_known: Dict[int, Dict] = {}
+    if STATUS_MODE == "transition":
+        try:
+            last_known = scan_latest_status(pb_token, all_serials, now - max_record_gap("transition"))
+        except Exception as exc:  # noqa: BLE001
+            print(f"Could not load last known states, writing all sensors: {exc}")
+
+    payloads: List[Dict] = []
+    skipped = 0
     for serial in all_serials:
         sensor_info = sensors.get(serial, {})
         online = bool(sensor_info.get("online", False))
+        if STATUS_MODE == "transition" and not needs_status_record(last_known.get(serial), online, now, HEARTBEAT):
+            skipped += 1
+            continue
         site_meta = serial_to_site.get(serial, {})
         country_name = site_meta.get("country_name") or site_meta.get("country", "")
         payload = {
@@ -103,7 +240,17 @@ def main() -> None:
         print(
             f"Posting {serial} ({site_meta.get('icao', '?')} - {site_meta.get('airport', '?')}) online={online}"
         )
-        post_pockethost_status(pb_token, payload)
+        payloads.append(payload)
+
+    if skipped:
+        print(f"Skipped {skipped} sensors with unchanged status (transition mode).")
+    started = time.monotonic()
+    failures = write_status_records(pb_token, payloads)
+    print(f"Wrote {len(payloads) - len(failures)}/{len(payloads)} status records in {time.monotonic() - started:.1f}s")
+    if failures:
+        for payload, error in failures:
+            print(f"Failed {payload['sensor_serial']}: {error}")
+        sys.exit(f"{len(failures)} status records could not be written.")
 
 
 if __name__ == "__main__":
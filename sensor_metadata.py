@@ -1,8 +1,12 @@
-import requests
+import os
 from typing import Dict, List, Optional, Tuple
 
-POCKETHOST_BASE = "https://opdi.pockethost.io"
+import http_client
+from disk_cache import disk_cached
+
+POCKETHOST_BASE = os.getenv("POCKETHOST_BASE", "https://opdi.pockethost.io")
 DETAILS_COLLECTION = "opensky_sensor_details"
+SENSOR_DETAILS_TTL = int(os.getenv("SENSOR_DETAILS_TTL", "600"))
 
 
 def normalize_serial(value: object) -> Optional[int]:
@@ -28,7 +32,7 @@ def fetch_sensor_details(token: str, per_page: int = 200) -> List[Dict[str, obje
 
     while True:
         params = {"page": page, "perPage": per_page, "sort": "airport_icao,sensor_serial"}
-        resp = requests.get(url, headers=headers, params=params, timeout=20)
+        resp = http_client.get(url, headers=headers, params=params)
         resp.raise_for_status()
         payload = resp.json()
         items = payload.get("items", [])
@@ -54,6 +58,12 @@ def fetch_sensor_details(token: str, per_page: int = 200) -> List[Dict[str, obje
     return rows
 
 
+@disk_cached("sensor_details", ttl=SENSOR_DETAILS_TTL, bust_arg=None)
+def cached_sensor_details(token: str) -> List[Dict[str, object]]:
+    """fetch_sensor_details through the shared disk cache, so jobs on one host reuse a recent copy."""
+    return fetch_sensor_details(token)
+
+
 def build_sensor_mappings(
     details: List[Dict[str, object]],
 ) -> Tuple[List[int], Dict[int, Dict[str, object]], Dict[str, Dict[str, object]]]:
@@ -0,0 +1,59 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one.
+
+    The first caller for a key runs the function; callers arriving while it is in flight wait
+    and receive the same result (or exception). Nothing is cached: once the call finishes, the
+    next caller starts a new one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._counts = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._counts["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counts["executed"] += 1
+            else:
+                self._counts["coalesced"] += 1
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = func()
+            except BaseException as exc:  # noqa: BLE001
+                call.error = exc
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        """Counters: calls made, calls executed upstream, calls coalesced, and keys in flight."""
+        with self._lock:
+            return {**self._counts, "in_flight": len(self._calls)}
+
+
+def request_key(path: str, params: Optional[Mapping[str, Any]] = None) -> Tuple:
+    """Key for a GET request: the path plus its parameters with sorted names and string values."""
+    return (path, tuple(sorted((str(name), str(value)) for name, value in (params or {}).items())))
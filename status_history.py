@@ -0,0 +1,246 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import http_client
+from sensor_metadata import POCKETHOST_BASE, normalize_serial
+
+STATUS_COLLECTION = "opensky_sensor_status"
+# "full" writes every sensor on every poll; "transition" only writes state changes plus heartbeats.
+STATUS_MODE = os.getenv("STATUS_MODE", "full").lower()
+POLL_INTERVAL = timedelta(minutes=int(os.getenv("STATUS_POLL_INTERVAL_MINUTES", "60")))
+HEARTBEAT = timedelta(hours=float(os.getenv("STATUS_HEARTBEAT_HOURS", "24")))
+
+HISTORY_MAX_WORKERS = int(os.getenv("HISTORY_MAX_WORKERS", "6"))
+HISTORY_PER_PAGE = int(os.getenv("HISTORY_PER_PAGE", "500"))
+
+STATUS_COLUMNS = ["serial", "icao", "airport", "country", "ts", "online"]
+# PocketBase record field -> DataFrame column; only these fields are requested.
+STATUS_FIELDS = {
+    "sensor_serial": "serial",
+    "sensor_site_airport_icao": "icao",
+    "sensor_site_airport_name": "airport",
+    "sensor_site_country_name": "country",
+    "polling_time": "ts",
+    "sensor_online": "online",
+}
+
+
+def to_pb_time(value: datetime) -> str:
+    """Format a datetime the way PocketBase stores it, so filter comparisons stay lexicographically exact."""
+    value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+def iso_to_dt(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def max_record_gap(mode: Optional[str] = None) -> timedelta:
+    """How long a status record stays valid before the sensor's state is considered unknown."""
+    if (mode or STATUS_MODE) == "transition":
+        return HEARTBEAT + POLL_INTERVAL / 2
+    return POLL_INTERVAL * 1.5
+
+
+def needs_status_record(previous: Optional[Dict], online: bool, now: datetime, heartbeat: timedelta = HEARTBEAT) -> bool:
+    """In transition mode, write a record on a state change or once the last record is a heartbeat old."""
+    if not previous or not previous.get("polling_time"):
+        return True
+    if bool(previous.get("sensor_online", False)) != online:
+        return True
+    # Half a poll of slack so the heartbeat lands on the poll at (not after) the interval.
+    return now - iso_to_dt(previous["polling_time"]) >= heartbeat - POLL_INTERVAL / 2
+
+
+def _fetch_status_page(
+    token: str, filter_expr: str, sort: str, page: int, per_page: int, skip_total: bool = False
+) -> Dict:
+    url = f"{POCKETHOST_BASE}/api/collections/{STATUS_COLLECTION}/records"
+    headers = {"Authorization": token, "User-Agent": "opensky-sensor-dashboard"}
+    params = {
+        "page": page,
+        "perPage": per_page,
+        "sort": sort,
+        "filter": filter_expr,
+        "fields": ",".join(["id", *STATUS_FIELDS]),
+    }
+    if skip_total:
+        params["skipTotal"] = 1
+    resp = http_client.get(url, headers=headers, params=params)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def iter_status_pages(
+    token: str,
+    filter_expr: str,
+    sort: str = "polling_time,id",
+    per_page: int = HISTORY_PER_PAGE,
+    max_workers: int = HISTORY_MAX_WORKERS,
+) -> Iterator[List[Dict]]:
+    """
+    Yield every page of status records matching a filter, fetching pages after the first concurrently.
+
+    The first response provides totalPages; the remaining pages are requested through a bounded
+    worker pool and yielded as they arrive, so page order is not preserved. The default ascending
+    sort keeps page boundaries stable while new polls are being written.
+    """
+    first = _fetch_status_page(token, filter_expr, sort, 1, per_page)
+    yield first.get("items", [])
+    total_pages = int(first.get("totalPages", 1) or 1)
+    if total_pages <= 1:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total_pages - 1))) as pool:
+        futures = [
+            pool.submit(_fetch_status_page, token, filter_expr, sort, page, per_page)
+            for page in range(2, total_pages + 1)
+        ]
+        for future in as_completed(futures):
+            yield future.result().get("items", [])
+
+
+def fetch_status_records(token: str, filter_expr: str, max_workers: int = HISTORY_MAX_WORKERS) -> List[Dict]:
+    """Fetch every status record matching a PocketBase filter expression (in no particular order)."""
+    items: List[Dict] = []
+    for page in iter_status_pages(token, filter_expr, max_workers=max_workers):
+        items.extend(page)
+    return items
+
+
+def scan_latest_status(
+    token: str, serials: Iterable[int], since: datetime, per_page: int = HISTORY_PER_PAGE
+) -> Dict[int, Dict]:
+    """
+    Return the newest record per serial since `since`, scanning newest-first.
+
+    The scan stops as soon as every requested serial has been seen, and never reads past the
+    staleness bound, so its cost depends on fleet size rather than on how much history exists.
+    Serials missing from the result have no record since `since`. Records of one poll share a
+    polling_time, so the id breaks ties to keep the page order stable between requests.
+    """
+    wanted = set(serials)
+    filter_expr = f'polling_time >= "{to_pb_time(since)}"'
+    latest: Dict[int, Dict] = {}
+    page = 1
+    while True:
+        items = _fetch_status_page(token, filter_expr, "-polling_time,-id", page, per_page, skip_total=True).get("items", [])
+        for item in items:
+            serial = normalize_serial(item.get("sensor_serial"))
+            if serial is None or serial in latest:
+                continue  # already have newest for this serial
+            latest[serial] = item
+        if (wanted and wanted.issubset(latest)) or len(items) < per_page:
+            break
+        page += 1
+    return latest
+
+
+def pages_to_frame(pages: Iterable[List[Dict]]) -> pd.DataFrame:
+    """Build a status DataFrame column by column from pages of PocketBase records."""
+    columns: Dict[str, List] = {column: [] for column in STATUS_FIELDS.values()}
+    for items in pages:
+        for field, column in STATUS_FIELDS.items():
+            columns[column].extend([item.get(field) for item in items])
+    df = pd.DataFrame(
+        {
+            "serial": pd.to_numeric(pd.Series(columns["serial"], dtype=object).astype(str).str.strip(), errors="coerce"),
+            "icao": pd.Series(columns["icao"], dtype=object).fillna(""),
+            "airport": pd.Series(columns["airport"], dtype=object).fillna(""),
+            "country": pd.Series(columns["country"], dtype=object).fillna(""),
+            "ts": pd.to_datetime(pd.Series(columns["ts"], dtype=object), utc=True, errors="coerce"),
+            "online": pd.Series(columns["online"], dtype=object).fillna(False).astype(bool),
+        },
+        columns=STATUS_COLUMNS,
+    )
+    df = df[df["serial"].notna() & df["ts"].notna()].copy()
+    df["serial"] = df["serial"].astype(int)
+    return df.reset_index(drop=True)
+
+
+def records_to_frame(items: List[Dict]) -> pd.DataFrame:
+    return pages_to_frame([items])
+
+
+def fetch_status_frame(token: str, filter_expr: str, max_workers: int = HISTORY_MAX_WORKERS) -> pd.DataFrame:
+    """Fetch all matching status records straight into a columnar DataFrame."""
+    return pages_to_frame(iter_status_pages(token, filter_expr, max_workers=max_workers))
+
+
+def rebuild_timeline(
+    df: pd.DataFrame, seeds: pd.DataFrame, start: datetime, end: datetime, max_gap: Optional[timedelta] = None
+) -> pd.DataFrame:
+    """
+    Turn run-length status records into a continuous per-sensor timeline over [start, end].
+
+    Each record's state holds until the sensor's next record, for at most max_gap. Seed records
+    (the last state before the window) are moved to the window start, and every sensor gets a
+    closing row where its last state stops being valid, so step charts span the full window.
+    """
+    max_gap = max_record_gap() if max_gap is None else max_gap
+    start_ts = pd.Timestamp(start)
+    end_ts = pd.Timestamp(end)
+    frames = [df]
+    if not seeds.empty:
+        seeds = seeds[seeds["ts"] + max_gap > start_ts].copy()
+        seeds["ts"] = start_ts
+        frames.insert(0, seeds)
+    timeline = pd.concat(frames, ignore_index=True)
+    if timeline.empty:
+        return timeline
+    timeline = timeline.sort_values(["serial", "ts"]).drop_duplicates(["serial", "ts"], keep="last")
+    closing = timeline.groupby("serial", sort=False).tail(1).copy()
+    closing["ts"] = (closing["ts"] + max_gap).clip(upper=end_ts)
+    timeline = pd.concat([timeline, closing], ignore_index=True)
+    return timeline.drop_duplicates(["serial", "ts"]).sort_values(["serial", "ts"]).reset_index(drop=True)
+
+
+def status_segments(timeline: pd.DataFrame, max_gap: Optional[timedelta] = None) -> pd.DataFrame:
+    """
+    Compact a per-sensor timeline into (serial, start, end, online) runs in one vectorized pass.
+
+    A row's state lasts until the sensor's next row, for at most max_gap; longer silences split
+    the run, leaving a gap where the state is unknown. The last row of each sensor only marks
+    where its final run ends (see rebuild_timeline).
+    """
+    max_gap = max_record_gap() if max_gap is None else max_gap
+    columns = ["serial", "icao", "airport", "country", "start", "end", "online"]
+    if timeline.empty:
+        return pd.DataFrame(columns=columns)
+    serial = timeline["serial"].to_numpy(dtype=np.int64)
+    ts = timeline["ts"].dt.tz_convert("UTC").dt.tz_localize(None).to_numpy(dtype="datetime64[ns]").view(np.int64)
+    if not np.all((serial[1:] > serial[:-1]) | ((serial[1:] == serial[:-1]) & (ts[1:] >= ts[:-1]))):
+        order = np.lexsort((ts, serial))
+        timeline = timeline.iloc[order]
+        serial, ts = serial[order], ts[order]
+    online = timeline["online"].to_numpy(dtype=bool)
+
+    has_next = np.r_[serial[1:] == serial[:-1], False]
+    next_ts = np.r_[ts[1:], 0]
+    expires = ts + int(max_gap / timedelta(microseconds=1)) * 1000
+    end = np.where(has_next & (next_ts <= expires), next_ts, expires)
+
+    rows = np.flatnonzero(has_next)
+    if not len(rows):
+        return pd.DataFrame(columns=columns)
+    s, t, e, o = serial[rows], ts[rows], end[rows], online[rows]
+    new_run = np.r_[True, (s[1:] != s[:-1]) | (o[1:] != o[:-1]) | (e[:-1] < t[1:])]
+    firsts = np.flatnonzero(new_run)
+    lasts = np.r_[firsts[1:] - 1, len(rows) - 1]
+    meta = timeline.iloc[rows[lasts]]
+    return pd.DataFrame(
+        {
+            "serial": s[firsts],
+            "icao": meta["icao"].to_numpy(),
+            "airport": meta["airport"].to_numpy(),
+            "country": meta["country"].to_numpy(),
+            "start": pd.to_datetime(t[firsts], utc=True),
+            "end": pd.to_datetime(e[lasts], utc=True),
+            "online": o[firsts],
+        },
+        columns=columns,
+    )
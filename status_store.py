@@ -0,0 +1,196 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from status_history import STATUS_COLUMNS, fetch_status_frame, to_pb_time
+
+STATUS_STORE_PATH = os.getenv("STATUS_STORE_PATH", os.path.join(".cache", "status_history.sqlite"))
+STATUS_STORE_RETENTION_DAYS = int(os.getenv("STATUS_STORE_RETENTION_DAYS", "400"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS status (
+    month TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    serial INTEGER NOT NULL,
+    icao TEXT NOT NULL DEFAULT '',
+    airport TEXT NOT NULL DEFAULT '',
+    country TEXT NOT NULL DEFAULT '',
+    online INTEGER NOT NULL,
+    PRIMARY KEY (month, ts, serial)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _to_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+def _from_ms(value: int) -> datetime:
+    return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+
+
+def _month(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m")
+
+
+def _months_between(start: datetime, end: datetime) -> List[str]:
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class StatusStore:
+    """
+    Local SQLite mirror of the opensky_sensor_status collection.
+
+    Rows are keyed by (month, ts, serial), so each calendar month is a contiguous partition that
+    range queries and retention pruning touch directly. sync() only downloads records at or after
+    the stored polling_time high-water mark, plus any older range a caller asks for that has not
+    been backfilled yet (tracked by a low-water mark).
+    """
+
+    def __init__(self, path: str = STATUS_STORE_PATH, retention: timedelta = timedelta(days=STATUS_STORE_RETENTION_DAYS)):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def watermarks(self) -> Dict[str, Optional[datetime]]:
+        with closing(self._connect()) as conn:
+            rows = dict(conn.execute("SELECT key, value FROM sync_state").fetchall())
+        return {key: _from_ms(rows[key]) if key in rows else None for key in ("low", "high", "synced")}
+
+    def sync(self, token: str, since: datetime, max_age: float = 0.0) -> int:
+        """
+        Bring the store up to date and make sure it covers everything from `since`; return rows fetched.
+
+        With max_age, a store that any process synced less than max_age seconds ago and that already
+        covers `since` is used as-is.
+        """
+        now = datetime.now(timezone.utc)
+        since = max(since, now - self.retention)
+        with self._lock:
+            marks = self.watermarks()
+            synced = marks.get("synced")
+            if (
+                max_age > 0
+                and synced is not None
+                and (now - synced).total_seconds() < max_age
+                and marks["low"] is not None
+                and marks["low"] <= since
+            ):
+                return 0
+            filters = []
+            if marks["high"] is None:
+                filters.append(f'polling_time >= "{to_pb_time(since)}"')
+            else:
+                # Inclusive bound: records of the latest poll may still have been arriving at the last sync.
+                filters.append(f'polling_time >= "{to_pb_time(marks["high"])}"')
+                if marks["low"] is not None and since < marks["low"]:
+                    filters.append(f'polling_time >= "{to_pb_time(since)}" && polling_time < "{to_pb_time(marks["low"])}"')
+            fetched = 0
+            for filter_expr in filters:
+                frame = fetch_status_frame(token, filter_expr)
+                self._insert(frame)
+                fetched += len(frame)
+            self._update_watermarks(since, now)
+            self._prune(now - self.retention)
+        return fetched
+
+    def _insert(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        ts = df["ts"].dt.tz_convert("UTC")
+        ts_ms = (ts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)
+        rows = zip(
+            ts.dt.strftime("%Y-%m"),
+            ts_ms.astype("int64").tolist(),
+            df["serial"].astype(int).tolist(),
+            df["icao"].fillna("").astype(str),
+            df["airport"].fillna("").astype(str),
+            df["country"].fillna("").astype(str),
+            df["online"].astype(int).tolist(),
+        )
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO status (month, ts, serial, icao, airport, country, online) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _update_watermarks(self, since: datetime, synced: datetime) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('synced', ?)", (_to_ms(synced),))
+            high = conn.execute("SELECT MAX(ts) FROM status").fetchone()[0]
+            low = conn.execute("SELECT value FROM sync_state WHERE key = 'low'").fetchone()
+            new_low = min(low[0], _to_ms(since)) if low else _to_ms(since)
+            conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('low', ?)", (new_low,))
+            if high is not None:
+                conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('high', ?)", (high,))
+
+    def _prune(self, before: datetime) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM status WHERE month < ?", (_month(before),))
+            conn.execute(
+                "UPDATE sync_state SET value = MAX(value, ?) WHERE key = 'low'",
+                (_to_ms(datetime.strptime(_month(before), "%Y-%m").replace(tzinfo=timezone.utc)),),
+            )
+
+    def query(self, start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+        """Return status rows with start < ts <= end, in the same shape as fetch_status_frame."""
+        end = end or datetime.now(timezone.utc)
+        months = _months_between(start, end)
+        placeholders = ",".join("?" * len(months))
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(
+                f"SELECT serial, icao, airport, country, ts, online FROM status "
+                f"WHERE month IN ({placeholders}) AND ts > ? AND ts <= ? ORDER BY serial, ts",
+                conn,
+                params=[*months, _to_ms(start), _to_ms(end)],
+            )
+        df["ts"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
+        df["online"] = df["online"].astype(bool)
+        return df[STATUS_COLUMNS]
+
+    def latest_records(self, before: datetime, since: datetime) -> Dict[int, Dict]:
+        """Newest record per serial with since <= ts <= before, shaped like PocketBase status records."""
+        months = _months_between(since, before)
+        placeholders = ",".join("?" * len(months))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT serial, icao, airport, country, MAX(ts), online FROM status "
+                f"WHERE month IN ({placeholders}) AND ts >= ? AND ts <= ? GROUP BY serial",
+                [*months, _to_ms(since), _to_ms(before)],
+            ).fetchall()
+        return {
+            serial: {
+                "sensor_serial": serial,
+                "sensor_site_airport_icao": icao,
+                "sensor_site_airport_name": airport,
+                "sensor_site_country_name": country,
+                "polling_time": to_pb_time(_from_ms(ts)),
+                "sensor_online": bool(online),
+            }
+            for serial, icao, airport, country, ts, online in rows
+        }
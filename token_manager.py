@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+
+import http_client
+
+AUTH_URL = os.getenv(
+    "OPENSKY_AUTH_URL", "https://auth.opensky-network.org/auth/realms/opensky-network/protocol/openid-connect/token"
+)
+# Refresh this many seconds before the token expires, so requests in flight never carry a stale token.
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", "60"))
+# Lifetime assumed when the token response has no expires_in.
+TOKEN_DEFAULT_EXPIRES_IN = 1800
+
+
+class TokenManager:
+    """
+    OAuth client-credentials token for one OpenSky client, shared by every thread in the process.
+
+    The token is reused until `margin` seconds before the expiry reported by the auth server.
+    Only one thread refreshes at a time; the others wait for its result instead of requesting
+    tokens of their own. request() retries a 401 once with a fresh token.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, auth_url: Optional[str] = None, margin: float = TOKEN_REFRESH_MARGIN):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.auth_url = auth_url or AUTH_URL
+        self.margin = margin
+        self._refresh_lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+
+    def _valid(self) -> bool:
+        return self._token is not None and time.time() < self._expires_at - self.margin
+
+    def token(self) -> str:
+        """Return a token that stays valid for at least `margin` seconds, refreshing it if needed."""
+        token = self._token
+        if self._valid() and token is not None:
+            return token
+        with self._refresh_lock:
+            # Another thread may have refreshed while this one waited.
+            if not self._valid():
+                self._token, self._expires_at = self._fetch()
+            return self._token
+
+    def invalidate(self, token: str) -> None:
+        """Drop `token` after the API rejected it; a token refreshed meanwhile is kept."""
+        with self._refresh_lock:
+            if self._token == token:
+                self._token = None
+                self._expires_at = 0.0
+
+    def _fetch(self) -> Tuple[str, float]:
+        requested_at = time.time()
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+        }
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        # Asking for another token is harmless, so connection drops are retried like a GET.
+        resp = http_client.post(self.auth_url, data=data, headers=headers, idempotent=True)
+        if not resp.ok:
+            raise RuntimeError(f"Token request failed ({resp.status_code}): {resp.text}")
+        payload = resp.json()
+        token = payload.get("access_token")
+        if not token:
+            raise RuntimeError("Token response did not include access_token")
+        try:
+            expires_in = float(payload.get("expires_in") or TOKEN_DEFAULT_EXPIRES_IN)
+        except (TypeError, ValueError):
+            expires_in = TOKEN_DEFAULT_EXPIRES_IN
+        return token, requested_at + expires_in
+
+    def request(self, method: str, url: str, token: Optional[str] = None, **kwargs) -> requests.Response:
+        """Send an authorized request (with `token`, or the current one); a 401 is retried once with a new token."""
+        token = token or self.token()
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Authorization"] = f"Bearer {token}"
+        resp = http_client.request(method, url, headers=headers, **kwargs)
+        if resp.status_code != 401:
+            return resp
+        resp.close()
+        self.invalidate(token)
+        headers["Authorization"] = f"Bearer {self.token()}"
+        return http_client.request(method, url, headers=headers, **kwargs)
+
+
+_managers: Dict[Tuple[str, str, str], TokenManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(client_id: str, client_secret: str, auth_url: Optional[str] = None) -> TokenManager:
+    """Return the process-wide TokenManager for these credentials."""
+    key = (client_id, client_secret, auth_url or AUTH_URL)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = TokenManager(client_id, client_secret, auth_url=key[2])
+            _managers[key] = manager
+    return manager